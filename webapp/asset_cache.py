@@ -0,0 +1,182 @@
+"""
+Asset Cache
+Bounded local read-through cache for files served from the network share
+(previews, holder previews, other assets).
+
+Each request costs one stat() of the source: if its size and mtime still
+match the cached copy, the local file is served (FileResponse, so the
+server can sendfile it); otherwise the source is copied in once. Least
+recently used copies are evicted when the cache exceeds its byte budget.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+MAX_ENTRY_FRACTION = 0.25  # files bigger than this share of the budget are served from the share directly
+EVICT_GRACE = 120.0        # seconds a copy handed to a response is protected from eviction
+
+# source path -> (local path, source size, source mtime_ns)
+_Entry = Tuple[str, int, int]
+
+
+class AssetCache:
+    """LRU copy of network files on local disk, validated by size + mtime"""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+        self.errors = 0
+        self.bytes_served = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._served_at: Dict[str, float] = {}  # source -> monotonic time the copy was last handed out
+        self._total_bytes = 0
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @staticmethod
+    def _key(source: Path) -> str:
+        return hashlib.sha1(os.path.normcase(os.path.abspath(source)).encode('utf-8')).hexdigest()
+
+    def _load(self):
+        """Pick up copies left by a previous run (oldest access first). Call with _lock held."""
+        if self._loaded:
+            return
+        self._loaded = True
+        found = []
+        for meta_path in self.cache_dir.glob("*/*.meta"):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                local = meta_path.with_suffix(meta.get('suffix', ''))
+                st = local.stat()
+            except (OSError, ValueError):
+                continue
+            found.append((st.st_atime, meta['source'], str(local), meta['size'], meta['mtime_ns']))
+        for _, source, local, size, mtime_ns in sorted(found):
+            self._entries[source] = (local, size, mtime_ns)
+            self._total_bytes += size
+
+    def _evict(self):
+        """Drop least recently used copies until within budget. Call with _lock held.
+
+        Copies handed out in the last EVICT_GRACE seconds may still be streaming
+        (FileResponse opens the path later), so eviction stops at the first of
+        them and the cache stays over budget for a while. A copy whose unlink
+        fails (open on Windows) is kept and still counted.
+        """
+        now = time.monotonic()
+        kept = []
+        while self._total_bytes > self.max_bytes and self._entries:
+            source, entry = next(iter(self._entries.items()))
+            if now - self._served_at.get(source, float('-inf')) < EVICT_GRACE:
+                break  # LRU order: everything after it was used even more recently
+            del self._entries[source]
+            local, size, _ = entry
+            try:
+                Path(local).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                kept.append((source, entry))
+                continue
+            try:
+                Path(local).with_suffix('.meta').unlink()
+            except OSError:
+                pass
+            self._served_at.pop(source, None)
+            self._total_bytes -= size
+            self.evictions += 1
+        for source, entry in reversed(kept):
+            self._entries[source] = entry
+            self._entries.move_to_end(source, last=False)
+
+    def get(self, source: Path) -> Path:
+        """Local path to serve for source (the source itself if it isn't cached).
+
+        Raises FileNotFoundError if the source doesn't exist.
+        """
+        st = os.stat(source)
+        key = os.path.normcase(os.path.abspath(source))
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry and entry[1] == st.st_size and entry[2] == st.st_mtime_ns:
+                self._entries.move_to_end(key)
+                self._served_at[key] = time.monotonic()
+                self.hits += 1
+                self.bytes_served += st.st_size
+                return Path(entry[0])
+            if st.st_size > self.max_bytes * MAX_ENTRY_FRACTION:
+                self.bypasses += 1
+                return Path(source)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry and entry[1] == st.st_size and entry[2] == st.st_mtime_ns:
+                        # Copied by a concurrent request while we waited
+                        self._entries.move_to_end(key)
+                        self._served_at[key] = time.monotonic()
+                        self.hits += 1
+                        return Path(entry[0])
+                return self._fetch(Path(source), key, st)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+
+    def _fetch(self, source: Path, key: str, st: os.stat_result) -> Path:
+        digest = self._key(source)
+        local = self.cache_dir / digest[:2] / (digest + source.suffix.lower())
+        try:
+            local.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = local.with_name(local.name + f".{threading.get_ident()}.tmp")
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, local)
+            with open(local.with_suffix('.meta'), 'w', encoding='utf-8') as f:
+                json.dump({"source": key, "suffix": local.suffix, "size": st.st_size,
+                           "mtime_ns": st.st_mtime_ns}, f)
+        except OSError as e:
+            self.errors += 1
+            print(f"Warning: asset cache copy failed for {source}: {e}")
+            return source
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._total_bytes -= old[1]
+            self._entries[key] = (str(local), st.st_size, st.st_mtime_ns)
+            self._served_at[key] = time.monotonic()
+            self._total_bytes += st.st_size
+            self.misses += 1
+            self._evict()
+        return local
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / requests, 3) if requests else None,
+                "evictions": self.evictions,
+                "bypasses": self.bypasses,
+                "errors": self.errors,
+                "bytesServed": self.bytes_served,
+            }
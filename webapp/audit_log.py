@@ -1,13 +1,532 @@
 """
 Audit Log System
 Tracks all changes to the database with timestamp, IP, and change details
+
+Recent entries are read backwards from the end of the log, and a sidecar
+index (product name -> byte offsets, updated on append) lets product
+history seek straight to the matching lines.
+
+log_action only enqueues: a single background writer thread appends entries
+in batches, so auditing adds no file I/O to request latency.
+
+The log is split into time-based segments: audit_log.jsonl is the active
+segment, and when a new period starts (or it grows too big) it is moved to
+audit_segments/ as gzip-compressed per-period segments, each with a small
+.meta.json (time bounds, actions, products, IPs). Queries only open the
+segments whose meta can match, and retention settings bound disk use.
+
+Rotation only renames the active file (to a pending-*.jsonl) under _lock;
+the writer compresses it after releasing the lock and publishes the segment
+metas in one short locked step. Readers open the active and pending files
+only while holding _lock, so no entry is ever between files for them.
 """
 from pathlib import Path
 from datetime import datetime
+import atexit
+import gzip
 import json
-from typing import Dict, Any, Optional
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional
 
 AUDIT_LOG_FILE = Path(__file__).parent.parent / "audit_log.jsonl"
+# Sidecar index: one [byte offset, product] JSON array per product entry
+AUDIT_INDEX_FILE = AUDIT_LOG_FILE.with_name(AUDIT_LOG_FILE.name + ".idx")
+# Closed, gzip-compressed segments (<name>.jsonl.gz + <name>.meta.json)
+AUDIT_SEGMENT_DIR = AUDIT_LOG_FILE.with_name("audit_segments")
+
+READ_BLOCK_SIZE = 64 * 1024
+
+# Background writer settings
+AUDIT_FLUSH_INTERVAL = 0.5   # seconds to collect entries into one batch
+AUDIT_MAX_BATCH = 500        # entries per batch write
+AUDIT_DURABILITY = "flush"   # "none" (OS decides), "flush" (per batch) or "fsync" (per batch, survives power loss)
+
+# Segmenting and retention
+AUDIT_SEGMENT_PERIOD = "day"                      # "day" or "month": one segment per period
+AUDIT_SEGMENT_MAX_BYTES = 16 * 1024 * 1024        # also rotate the active segment past this size
+AUDIT_RETENTION_DAYS = 365                        # drop segments older than this (None keeps everything)
+AUDIT_RETENTION_MAX_BYTES = 256 * 1024 * 1024     # cap on compressed segments on disk (None: no cap)
+
+_lock = threading.Lock()
+_product_offsets: Dict[str, List[int]] = {}
+_indexed_size = -1  # Log bytes covered by _product_offsets (-1: not loaded yet)
+_segments: Optional[List[Dict[str, Any]]] = None  # Segment metas, oldest first (None: not loaded yet)
+_pending: Optional[List[Path]] = None  # Rotated, not yet compressed active segments, oldest first
+
+def _iter_lines_reversed(path: Path) -> Iterator[bytes]:
+    """Yield the non-empty lines of a file last-first, reading blocks from the end"""
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        remainder = b''
+        while pos > 0:
+            size = min(READ_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + remainder).split(b'\n')
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if remainder.strip():
+            yield remainder
+
+def _scan_offsets(start: int) -> Dict[str, List[int]]:
+    """Collect product -> offsets for log entries from byte offset start to EOF"""
+    found: Dict[str, List[int]] = {}
+    with open(AUDIT_LOG_FILE, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if line.strip():
+                try:
+                    product = json.loads(line).get('product')
+                except ValueError:
+                    product = None
+                if product:
+                    found.setdefault(product, []).append(offset)
+            offset += len(line)
+    return found
+
+def _append_index(entries: List[list]):
+    if entries:
+        with open(AUDIT_INDEX_FILE, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+def _ensure_index():
+    """Load the sidecar index and catch it up with entries it doesn't cover yet.
+
+    Must be called with _lock held.
+    """
+    global _product_offsets, _indexed_size
+
+    log_size = AUDIT_LOG_FILE.stat().st_size if AUDIT_LOG_FILE.exists() else 0
+    if _indexed_size == log_size:
+        return
+
+    if _indexed_size < 0 or _indexed_size > log_size:
+        # First use in this process (or the log was replaced): load the sidecar
+        _product_offsets = {}
+        last_offset = -1
+        if AUDIT_INDEX_FILE.exists():
+            with open(AUDIT_INDEX_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        offset, product = json.loads(line)
+                    except ValueError:
+                        continue
+                    _product_offsets.setdefault(product, []).append(offset)
+                    last_offset = max(last_offset, offset)
+
+        if last_offset >= log_size:
+            # Sidecar belongs to a different/truncated log: rebuild it
+            _product_offsets = {}
+            last_offset = -1
+            AUDIT_INDEX_FILE.unlink()
+
+        # Resume after the last indexed entry
+        _indexed_size = 0
+        if last_offset >= 0:
+            with open(AUDIT_LOG_FILE, 'rb') as f:
+                f.seek(last_offset)
+                _indexed_size = last_offset + len(f.readline())
+
+    if _indexed_size < log_size:
+        found = _scan_offsets(_indexed_size)
+        _append_index(sorted([offset, product] for product, offsets in found.items() for offset in offsets))
+        for product, offsets in found.items():
+            _product_offsets.setdefault(product, []).extend(offsets)
+    _indexed_size = log_size
+
+def _segment_key(timestamp: str) -> str:
+    """Period an entry belongs to, from its ISO timestamp"""
+    return timestamp[:7] if AUDIT_SEGMENT_PERIOD == "month" else timestamp[:10]
+
+def _first_timestamp(path: Path) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    return json.loads(line).get('timestamp')
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _load_segments() -> List[Dict[str, Any]]:
+    """Segment metas sorted oldest first (cached until the next rotation)"""
+    global _segments
+
+    if _segments is None:
+        metas = []
+        if AUDIT_SEGMENT_DIR.exists():
+            for meta_path in AUDIT_SEGMENT_DIR.glob("*.meta.json"):
+                try:
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if (AUDIT_SEGMENT_DIR / meta.get('file', '')).exists():
+                    metas.append(meta)
+        _segments = sorted(metas, key=lambda m: (m['start'], m['file']))
+    return _segments
+
+def _write_segment(key: str, lines: List[bytes]) -> Optional[Dict[str, Any]]:
+    """Compress one period's entries into a segment file; returns its meta (not written yet)"""
+    timestamps, actions, products, ips = [], {}, set(), set()
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        timestamps.append(entry.get('timestamp') or '')
+        action = entry.get('action') or ''
+        actions[action] = actions.get(action, 0) + 1
+        if entry.get('product'):
+            products.add(entry['product'])
+        if entry.get('ip'):
+            ips.add(entry['ip'])
+    if not timestamps:
+        return None
+
+    AUDIT_SEGMENT_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"audit-{min(timestamps)[:19].replace(':', '')}"
+    suffix = 0
+    while (AUDIT_SEGMENT_DIR / f"{name}.jsonl.gz").exists():
+        suffix += 1
+        name = f"audit-{min(timestamps)[:19].replace(':', '')}-{suffix}"
+
+    data_path = AUDIT_SEGMENT_DIR / f"{name}.jsonl.gz"
+    tmp_path = data_path.with_name(data_path.name + ".tmp")
+    with gzip.open(tmp_path, 'wb') as f:
+        f.writelines(line if line.endswith(b'\n') else line + b'\n' for line in lines)
+    os.replace(tmp_path, data_path)
+
+    return {
+        "file": data_path.name,
+        "period": key,
+        "start": min(timestamps),
+        "end": max(timestamps),
+        "count": len(timestamps),
+        "actions": actions,
+        "products": sorted(products),
+        "ips": sorted(ips),
+        "bytes": data_path.stat().st_size,
+    }
+
+def _write_meta(meta: Dict[str, Any]):
+    """Publish a segment: _load_segments only lists segments that have a meta"""
+    name = meta['file'][:-len(".jsonl.gz")]
+    with open(AUDIT_SEGMENT_DIR / f"{name}.meta.json", 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+def _pending_files() -> List[Path]:
+    """Rotated active segments awaiting compression (must hold _lock)"""
+    global _pending
+
+    if _pending is None:
+        _pending = sorted(AUDIT_SEGMENT_DIR.glob("pending-*.jsonl")) if AUDIT_SEGMENT_DIR.exists() else []
+    return _pending
+
+def _detach_active():
+    """Set the active log aside for compression; the next write starts a new one.
+
+    Must be called with _lock held and the active file closed. Only renames,
+    so the lock is held for a moment regardless of the log size.
+    """
+    global _product_offsets, _indexed_size
+
+    if not AUDIT_LOG_FILE.exists():
+        return
+    AUDIT_SEGMENT_DIR.mkdir(parents=True, exist_ok=True)
+    pending = AUDIT_SEGMENT_DIR / f"pending-{time.time_ns()}.jsonl"
+    os.replace(AUDIT_LOG_FILE, pending)
+    _pending_files().append(pending)
+    if AUDIT_INDEX_FILE.exists():
+        AUDIT_INDEX_FILE.unlink()
+    _product_offsets = {}
+    _indexed_size = 0
+
+def _compress_pending():
+    """Compress set-aside active logs into per-period segments (writer thread, without _lock).
+
+    Also migrates a legacy single-file log: its entries are split by period.
+    """
+    global _segments
+
+    with _lock:
+        pending = list(_pending_files())
+    for path in pending:
+        groups: Dict[str, List[bytes]] = {}
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    timestamp = json.loads(line).get('timestamp') or ''
+                except ValueError:
+                    continue
+                groups.setdefault(_segment_key(timestamp), []).append(line)
+        metas = [meta for meta in (_write_segment(key, groups[key]) for key in sorted(groups)) if meta]
+
+        # Publish the segments and drop the pending file in one step, so readers see each entry once
+        with _lock:
+            for meta in metas:
+                _write_meta(meta)
+            path.unlink()
+            _pending_files().remove(path)
+            _segments = None
+            _apply_retention()
+        if groups:
+            print(f"🗂️  Audit log rotated into {len(groups)} segment(s)")
+
+def _apply_retention():
+    """Delete the oldest segments beyond the age/size limits"""
+    global _segments
+
+    segments = list(_load_segments())
+    cutoff = None
+    if AUDIT_RETENTION_DAYS is not None:
+        cutoff = datetime.fromtimestamp(time.time() - AUDIT_RETENTION_DAYS * 86400).isoformat()
+    total = sum(m.get('bytes', 0) for m in segments)
+
+    removed = 0
+    for meta in segments:
+        too_old = cutoff is not None and meta['end'] < cutoff
+        too_big = AUDIT_RETENTION_MAX_BYTES is not None and total > AUDIT_RETENTION_MAX_BYTES
+        if not (too_old or too_big):
+            break
+        name = meta['file'][:-len(".jsonl.gz")]
+        for path in (AUDIT_SEGMENT_DIR / meta['file'], AUDIT_SEGMENT_DIR / f"{name}.meta.json"):
+            if path.exists():
+                path.unlink()
+        total -= meta.get('bytes', 0)
+        removed += 1
+    if removed:
+        _segments = None
+        print(f"🗑️  Audit retention removed {removed} old segment(s)")
+
+def _read_segment(meta: Dict[str, Any]) -> List[bytes]:
+    with gzip.open(AUDIT_SEGMENT_DIR / meta['file'], 'rb') as f:
+        return [line for line in f if line.strip()]
+
+def _iter_segments_reversed(segments: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Entries of the given segments, most recent first.
+
+    Segments are read outside _lock, so retention may delete one after it was
+    listed; a segment that is gone (or unreadable) is skipped.
+    """
+    for meta in reversed(segments):
+        try:
+            lines = _read_segment(meta)
+        except OSError:
+            continue
+        for line in reversed(lines):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def get_storage_stats() -> Dict[str, Any]:
+    """Active segment size plus count/size of the compressed segments"""
+    with _lock:
+        segments = list(_load_segments())
+    return {
+        "activeBytes": AUDIT_LOG_FILE.stat().st_size if AUDIT_LOG_FILE.exists() else 0,
+        "segments": len(segments),
+        "segmentBytes": sum(m.get('bytes', 0) for m in segments),
+        "oldest": segments[0]['start'] if segments else None,
+        "period": AUDIT_SEGMENT_PERIOD,
+        "retentionDays": AUDIT_RETENTION_DAYS,
+        "retentionMaxBytes": AUDIT_RETENTION_MAX_BYTES,
+    }
+
+class AuditWriter:
+    """Single background thread that appends queued entries in batches"""
+
+    def __init__(self, flush_interval: float = AUDIT_FLUSH_INTERVAL, durability: str = AUDIT_DURABILITY):
+        if durability not in ("none", "flush", "fsync"):
+            raise ValueError(f"Unknown durability policy: {durability}")
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._segment_key: Optional[str] = None
+        self.entries_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if not (self._thread and self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, entry: Dict[str, Any]):
+        """Queue an entry without blocking the caller"""
+        self._ensure_started()
+        self._queue.put(entry)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is written (and flushed)"""
+        if not (self._thread and self._thread.is_alive()):
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Drain the queue, close the log file and stop the thread"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queueDepth": self._queue.qsize(),
+            "entriesWritten": self.entries_written,
+            "batchesWritten": self.batches_written,
+            "writeErrors": self.write_errors,
+            "lastFlushMs": round(self.last_flush_ms, 3),
+            "avgFlushMs": round(self._total_flush_ms / self.batches_written, 3) if self.batches_written else 0.0,
+            "maxFlushMs": round(self.max_flush_ms, 3),
+            "flushInterval": self.flush_interval,
+            "durability": self.durability,
+        }
+
+    def _run(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            batch: List[Dict[str, Any]] = []
+            waiters: List[threading.Event] = []
+
+            # Collect a batch until the interval elapses, a flush is requested or we stop
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    running = False
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= AUDIT_MAX_BATCH:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            self._write(batch, force_flush=bool(waiters) or not running)
+            for waiter in waiters:
+                waiter.set()
+            self._archive()
+
+        self._close()
+
+    def _write(self, batch: List[Dict[str, Any]], force_flush: bool = False):
+        global _indexed_size
+
+        if not batch and not (force_flush and self._file):
+            return
+        start = time.perf_counter()
+        try:
+            with _lock:
+                if self._file is None:
+                    self._open()
+                index_entries = []
+                for entry in batch:
+                    key = _segment_key(entry['timestamp'])
+                    if self._segment_key is None:
+                        self._segment_key = key
+                    elif key != self._segment_key or self._file.tell() >= AUDIT_SEGMENT_MAX_BYTES:
+                        # New period (or oversized segment): set it aside, compressed after the lock is released
+                        self._close()
+                        _detach_active()
+                        self._open()
+                        self._segment_key = key
+                        index_entries = []
+                    offset = self._file.tell()
+                    self._file.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+                    if entry.get('product'):
+                        index_entries.append([offset, entry['product']])
+                        _product_offsets.setdefault(entry['product'], []).append(offset)
+                if self.durability != "none" or force_flush:
+                    self._file.flush()
+                if self.durability == "fsync":
+                    os.fsync(self._file.fileno())
+                _append_index(index_entries)
+                _indexed_size = self._file.tell()
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Warning: Failed to write audit log: {e}")
+            self._close()
+            return
+
+        if not batch:
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        self.entries_written += len(batch)
+        self.batches_written += 1
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        self._total_flush_ms += elapsed
+
+    def _archive(self):
+        """Compress logs set aside by rotation (readers keep seeing them meanwhile)"""
+        with _lock:
+            if not _pending_files():
+                return
+        try:
+            _compress_pending()
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Warning: Failed to compress audit segment: {e}")
+
+    def _open(self):
+        """Open the active segment for appending (must hold _lock)"""
+        first = _first_timestamp(AUDIT_LOG_FILE) if AUDIT_LOG_FILE.exists() else None
+        self._segment_key = _segment_key(first) if first else None
+        _ensure_index()
+        self._file = open(AUDIT_LOG_FILE, 'ab')
+        self._file.seek(0, os.SEEK_END)
+
+    def _close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+_writer = AuditWriter()
+atexit.register(_writer.stop)
+
+def flush_audit_log(timeout: float = 5.0) -> bool:
+    """Wait until all queued audit entries are on disk"""
+    return _writer.flush(timeout)
+
+def shutdown_audit_log():
+    """Drain queued entries and stop the background writer"""
+    _writer.stop()
+
+def get_writer_stats() -> Dict[str, Any]:
+    """Queue depth and flush latency of the background writer"""
+    return _writer.stats()
 
 def log_action(
     action: str,
@@ -18,7 +537,7 @@ def log_action(
 ):
     """
     Log an action to the audit log
-    
+
     Args:
         action: Type of action (create, update, delete, auto_populate, scan)
         product_name: Name of product affected (None for global actions)
@@ -34,36 +553,50 @@ def log_action(
         "user_agent": user_agent,
         "details": details or {}
     }
-    
-    # Append to JSONL file (one JSON object per line)
-    try:
-        with open(AUDIT_LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(log_entry, ensure_ascii=False) + '\n')
-    except Exception as e:
-        print(f"Warning: Failed to write audit log: {e}")
+
+    # Appended to the JSONL file (one JSON object per line) by the background writer
+    _writer.enqueue(log_entry)
+
+def _iter_unarchived_reversed() -> Iterator[Dict[str, Any]]:
+    """Entries of the active log, then of the pending ones, most recent first.
+
+    Must be consumed with _lock held: rotation renames these files.
+    """
+    paths = [AUDIT_LOG_FILE] + list(reversed(_pending_files()))
+    for path in paths:
+        if path.exists():
+            for line in _iter_lines_reversed(path):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
 
 def get_recent_logs(limit: int = 100) -> list:
     """
     Get recent audit log entries
-    
+
     Args:
         limit: Maximum number of entries to return
-    
+
     Returns:
         List of log entries (most recent first)
     """
-    if not AUDIT_LOG_FILE.exists():
-        return []
-    
+    flush_audit_log()
+
+    # Read backwards from the end: cost grows with limit, not with the log
     logs = []
     try:
-        with open(AUDIT_LOG_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    logs.append(json.loads(line))
-        
-        # Return most recent first
-        return logs[-limit:][::-1]
+        with _lock:
+            segments = list(_load_segments())
+            for entry in _iter_unarchived_reversed():
+                if len(logs) >= limit:
+                    return logs
+                logs.append(entry)
+        for entry in _iter_segments_reversed(segments):
+            if len(logs) >= limit:
+                break
+            logs.append(entry)
+        return logs
     except Exception as e:
         print(f"Warning: Failed to read audit log: {e}")
         return []
@@ -71,28 +604,123 @@ def get_recent_logs(limit: int = 100) -> list:
 def get_product_history(product_name: str, limit: int = 50) -> list:
     """
     Get audit history for a specific product
-    
+
     Args:
         product_name: Name of the product
         limit: Maximum number of entries to return
-    
+
     Returns:
         List of log entries for this product (most recent first)
     """
-    if not AUDIT_LOG_FILE.exists():
+    flush_audit_log()
+    if limit <= 0:
         return []
-    
+
     product_logs = []
     try:
-        with open(AUDIT_LOG_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    entry = json.loads(line)
+        with _lock:
+            _ensure_index()
+            offsets = _product_offsets.get(product_name, [])[-limit:]
+            segments = [m for m in _load_segments() if product_name in m.get('products', ())]
+
+            # Seek straight to this product's entries in the active segment, most recent first
+            if offsets:
+                with open(AUDIT_LOG_FILE, 'rb') as f:
+                    for offset in reversed(offsets):
+                        f.seek(offset)
+                        product_logs.append(json.loads(f.readline()))
+
+            # Logs rotated out but not compressed yet have no index: scan them
+            for path in reversed(_pending_files()):
+                if len(product_logs) >= limit:
+                    break
+                for line in _iter_lines_reversed(path):
+                    if len(product_logs) >= limit:
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
                     if entry.get('product') == product_name:
                         product_logs.append(entry)
-        
-        # Return most recent first
-        return product_logs[-limit:][::-1]
+
+        # Then only the archived segments that mention the product
+        for entry in _iter_segments_reversed(segments):
+            if len(product_logs) >= limit:
+                break
+            if entry.get('product') == product_name:
+                product_logs.append(entry)
+        return product_logs
     except Exception as e:
         print(f"Warning: Failed to read audit log: {e}")
         return []
+
+def query_logs(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    action: Optional[str] = None,
+    product_name: Optional[str] = None,
+    ip_address: Optional[str] = None,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Filter audit entries, opening only the segments that can match
+
+    Args:
+        start: ISO timestamp/date, inclusive lower bound
+        end: ISO timestamp/date, inclusive upper bound
+        action: Exact action name
+        product_name: Exact product name
+        ip_address: Exact requester IP
+        limit: Maximum number of entries to return
+
+    Returns:
+        Dict with the matching entries (most recent first) and how many
+        segments were read vs skipped thanks to their meta
+    """
+    # Normalize so plain string comparison matches datetime order; a date-only
+    # end bound covers that whole day
+    if start:
+        start = datetime.fromisoformat(start).isoformat()
+    if end:
+        end_dt = datetime.fromisoformat(end)
+        end = end_dt.isoformat() if 'T' in end or ' ' in end else end_dt.strftime('%Y-%m-%dT23:59:59.999999')
+
+    def matches(entry: Dict[str, Any]) -> bool:
+        timestamp = entry.get('timestamp') or ''
+        return ((not start or timestamp >= start)
+                and (not end or timestamp <= end)
+                and (not action or entry.get('action') == action)
+                and (not product_name or entry.get('product') == product_name)
+                and (not ip_address or entry.get('ip') == ip_address))
+
+    def segment_may_match(meta: Dict[str, Any]) -> bool:
+        return ((not start or meta['end'] >= start)
+                and (not end or meta['start'] <= end)
+                and (not action or action in meta.get('actions', {}))
+                and (not product_name or product_name in meta.get('products', ()))
+                and (not ip_address or ip_address in meta.get('ips', ())))
+
+    flush_audit_log()
+    logs = []
+    with _lock:
+        segments = list(_load_segments())
+        for entry in _iter_unarchived_reversed():
+            if len(logs) >= limit:
+                break
+            if matches(entry):
+                logs.append(entry)
+    selected = [m for m in segments if segment_may_match(m)]
+
+    for entry in _iter_segments_reversed(selected):
+        if len(logs) >= limit:
+            break
+        if matches(entry):
+            logs.append(entry)
+
+    return {
+        "logs": logs,
+        "count": len(logs),
+        "segmentsSelected": len(selected),
+        "segmentsSkipped": len(segments) - len(selected),
+    }
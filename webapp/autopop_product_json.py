@@ -5,37 +5,89 @@ Auto-populate product JSON files with missing data
 - Holder previews
 - Packaging details
 """
+import fnmatch
 import json
+import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Iterable, Iterator
 
 # Add parent to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from holder_catalog import HolderCatalog
+
 BASE_PATH = Path(r"M:\Proiectare\__SCAN 3D Produse\__BOSCH\__NEW DB__")
 TOOLS_PATH = BASE_PATH / "Tools and Holders"
 
-def find_file(folder: Path, patterns: List[str]) -> Optional[str]:
-    """Find first matching file by patterns (case insensitive)"""
+# Products auto-populated in parallel by autopop_batch (network-bound, so threads)
+BATCH_WORKERS = 8
+
+# Holder files/previews index used when no catalog is passed in (the server shares its own)
+_holder_catalog: Optional[HolderCatalog] = None
+
+def get_holder_catalog() -> HolderCatalog:
+    global _holder_catalog
+    if _holder_catalog is None or _holder_catalog.tools_path != TOOLS_PATH:
+        _holder_catalog = HolderCatalog(TOOLS_PATH)
+    return _holder_catalog
+
+def list_folder(folder: Path) -> Dict[str, str]:
+    """List a folder's files once: name -> full path.
+
+    Every file is keyed by its lowercase name, plus its exact name when that
+    differs, so lookups can prefer an exact-case match.
+    """
+    listing = {}
+    exact = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        listing.setdefault(entry.name.lower(), str(folder / entry.name))
+                        exact[entry.name] = str(folder / entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        return {}
+    listing.update(exact)
+    return listing
+
+def find_file(folder: Path, patterns: List[str], listing: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """Find first matching file by patterns (case insensitive).
+
+    Pass the folder's list_folder() result to resolve several lookups
+    against a single directory listing.
+    """
+    if listing is None:
+        listing = list_folder(folder)
     for pattern in patterns:
-        for file in folder.glob(pattern):
-            if file.is_file():
-                return str(file)
-        # Try case insensitive
-        for file in folder.iterdir():
-            if file.is_file() and file.name.lower() == pattern.lower():
-                return str(file)
+        if any(c in pattern for c in '*?['):
+            matches = sorted(path for name, path in listing.items() if fnmatch.fnmatch(name.lower(), pattern.lower()))
+            if matches:
+                return matches[0]
+            continue
+        path = listing.get(pattern) or listing.get(pattern.lower())
+        if path:
+            return path
     return None
 
-def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
+def autopop_product_json(product_folder: Path, force: bool = False, catalog: Optional[HolderCatalog] = None) -> Dict:
     """Auto-populate a single product JSON with file paths"""
     product_name = product_folder.name
-    json_path = product_folder / f"{product_name}.json"
+    catalog = catalog or get_holder_catalog()
     
-    if not json_path.exists():
+    # One listing of the product folder answers every file lookup below
+    listing = list_folder(product_folder)
+    json_path = product_folder / f"{product_name}.json"
+    found_json = listing.get(json_path.name) or listing.get(json_path.name.lower())
+    if not found_json:
         raise FileNotFoundError(f"JSON not found: {json_path}")
+    json_path = Path(found_json)
     
     # Load existing JSON
     with open(json_path, 'r', encoding='utf-8') as f:
@@ -132,7 +184,7 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
     
     # 1. Mesh 3D file
     if force or 'mesh3d' not in previews or not previews['mesh3d'].get('fullPath'):
-        mesh_path = find_file(product_folder, [
+        mesh_path = find_file(product_folder, listing=listing, patterns=[
             f"{product_name}_mesh.3dm",
             f"{product_name}_Mesh.3dm",
             f"{product_name}.3dm"
@@ -146,7 +198,7 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
     
     # 2. Mesh Preview (PNG/JPG)
     if force or 'meshPreview' not in previews or not previews.get('meshPreview', {}).get('fullPath'):
-        preview_path = find_file(product_folder, [
+        preview_path = find_file(product_folder, listing=listing, patterns=[
             f"{product_name}_mesh.png",
             f"{product_name}_mesh.jpg",
             f"{product_name}_Mesh.PNG",
@@ -164,7 +216,7 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
     
     # 3. Grafica 3D file
     if force or 'grafica3d' not in previews or not previews.get('grafica3d', {}).get('fullPath'):
-        grafica_path = find_file(product_folder, [
+        grafica_path = find_file(product_folder, listing=listing, patterns=[
             f"{product_name}_grafica.3dm",
             f"{product_name}_Grafica.3dm",
             f"{product_name}_graphics.3dm"
@@ -178,7 +230,7 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
     
     # 4. Grafica Preview
     if force or 'graficaPreview' not in previews or not previews.get('graficaPreview', {}).get('fullPath'):
-        grafica_preview = find_file(product_folder, [
+        grafica_preview = find_file(product_folder, listing=listing, patterns=[
             f"{product_name}_grafica.png",
             f"{product_name}_grafica.jpg",
             f"{product_name}_Grafica.PNG",
@@ -193,7 +245,7 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
     
     # === PROXY MESH ===
     if force or 'proxyMesh' not in previews or not previews.get('proxyMesh', {}).get('fullPath'):
-        proxy_path = find_file(product_folder, [
+        proxy_path = find_file(product_folder, listing=listing, patterns=[
             f"{product_name}_proxy mesh.3dm",
             f"{product_name}_proxy_mesh.3dm",
             f"{product_name}_Proxy Mesh.3dm",
@@ -214,7 +266,7 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
     packaging = data['packaging']
     
     if force or not packaging.get('fullPath'):
-        packaging_path = find_file(product_folder, [
+        packaging_path = find_file(product_folder, listing=listing, patterns=[
             f"{product_name}_packaging.3dm",
             f"{product_name}_Packaging.3dm",
             f"{product_name}_package.3dm"
@@ -225,7 +277,7 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
             changes.append(f"✓ Added packaging 3DM path")
     
     if force or not packaging.get('previewPath'):
-        pkg_preview = find_file(product_folder, [
+        pkg_preview = find_file(product_folder, listing=listing, patterns=[
             f"{product_name}_packaging.png",
             f"{product_name}_packaging.jpg",
             f"{product_name}_Packaging.PNG",
@@ -251,18 +303,8 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
             if force or not holder.get('fullPath'):
                 # Look in Holders folder structure
                 # Structure: .../{RANGE}/{CATEGORY}/Holders/{variant}_{color}_{cod}.3dm
+                # (the catalog searches Holders/{category}, {category}/Holders, then Holders/)
                 category_folder = product_folder.parent
-                holders_base = TOOLS_PATH / "Holders"
-                
-                # Get category from path
-                category_name = category_folder.name
-                
-                # Search locations (prioritize category-specific paths)
-                search_paths = [
-                    holders_base / category_name,  # Central Holders/{category} (PRIMARY)
-                    category_folder / "Holders",  # Same category
-                    holders_base  # Root Holders folder (fallback)
-                ]
                 
                 holder_filename = holder.get('fileName', f"{variant}_{color}_{cod}.3dm")
                 
@@ -273,33 +315,18 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
                     holder_filename.replace('.3dm', '') + '.3dm'  # Clean and add single .3dm
                 ]
                 
-                for search_path in search_paths:
-                    if search_path.exists():
-                        found = False
-                        for filename_var in filename_variations:
-                            holder_file = search_path / filename_var
-                            if holder_file.exists():
-                                # Update both filename and fullPath
-                                holder['fileName'] = filename_var
-                                holder['fullPath'] = str(holder_file).replace('\\', '/')
-                                changes.append(f"✓ Found holder file: {variant} - {color} at {search_path.name}/")
-                                found = True
-                                break
-                        if found:
-                            break
+                holder_file = catalog.find_holder_file(category_folder, filename_variations)
+                if holder_file:
+                    # Update both filename and fullPath
+                    holder['fileName'] = holder_file.name
+                    holder['fullPath'] = str(holder_file).replace('\\', '/')
+                    changes.append(f"✓ Found holder file: {variant} - {color} at {holder_file.parent.name}/")
             
             # === Find holder preview ===
             if force or not holder.get('preview'):
                 category_folder = product_folder.parent
                 
-                # Search for previews in multiple locations
-                preview_search_paths = [
-                    category_folder / 'Holders' / 'previews',
-                    category_folder / 'Holders' / 'Previews',
-                    TOOLS_PATH / 'Holders' / category_folder.name / 'previews',
-                    TOOLS_PATH / 'Holders' / category_folder.name / 'Previews'
-                ]
-                
+                # Searched in {category}/Holders/Previews, then Holders/{category}/Previews
                 preview_patterns = [
                     f"{variant}_{color}_{cod}.png",
                     f"{variant}_{color}_{cod}.jpg",
@@ -307,16 +334,10 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
                     f"{variant}_{color}.jpg"
                 ]
                 
-                for previews_folder in preview_search_paths:
-                    if previews_folder.exists():
-                        for pattern in preview_patterns:
-                            preview_file = previews_folder / pattern
-                            if preview_file.exists():
-                                holder['preview'] = str(preview_file)
-                                changes.append(f"✓ Added holder preview: {variant} - {color}")
-                                break
-                        if holder.get('preview'):
-                            break
+                preview_file = catalog.find_holder_preview(category_folder, preview_patterns)
+                if preview_file:
+                    holder['preview'] = str(preview_file)
+                    changes.append(f"✓ Added holder preview: {variant} - {color}")
     
     # === HOLDER TRANSFORMS ===
     # Initialize transform data for each holder variant (transform strategy)
@@ -403,15 +424,9 @@ def autopop_product_json(product_folder: Path, force: bool = False) -> Dict:
             "message": "No changes needed"
         }
 
-def autopop_all_products(force: bool = False):
-    """Auto-populate all products in database"""
-    if not TOOLS_PATH.exists():
-        print(f"ERROR: Tools path not found: {TOOLS_PATH}")
-        return
-    
-    results = []
-    
-    for range_folder in TOOLS_PATH.iterdir():
+def iter_product_folders(tools_path: Path = TOOLS_PATH) -> Iterator[Path]:
+    """Yield every product folder that has its {name}.json"""
+    for range_folder in tools_path.iterdir():
         if not range_folder.is_dir() or range_folder.name.startswith('_'):
             continue
         
@@ -429,18 +444,55 @@ def autopop_all_products(force: bool = False):
                 
                 json_file = product_folder / f"{product_folder.name}.json"
                 if json_file.exists():
-                    try:
-                        result = autopop_product_json(product_folder, force=force)
-                        results.append(result)
-                    except Exception as e:
-                        print(f"  ✗ ERROR: {e}\n")
-                        results.append({
-                            "success": False,
-                            "productName": product_folder.name,
-                            "error": str(e)
-                        })
-    
-    return results
+                    yield product_folder
+
+def autopop_batch(
+    product_folders: Iterable[Path],
+    force: bool = False,
+    workers: int = BATCH_WORKERS,
+    cancel_event: Optional[threading.Event] = None,
+    catalog: Optional[HolderCatalog] = None
+) -> Iterator[Dict]:
+    """Auto-populate many products on a bounded thread pool.
+
+    Yields one result per product as it finishes (completion order). At most
+    `workers` products are in flight, so setting cancel_event stops the batch
+    after the running ones complete; products never started are not yielded.
+    """
+    folders = iter(product_folders)
+    # One holder catalog for the whole batch: holder lookups are dictionary hits
+    catalog = catalog or get_holder_catalog()
+    
+    def run(folder: Path) -> Dict:
+        try:
+            result = autopop_product_json(folder, force=force, catalog=catalog)
+        except Exception as e:
+            print(f"  ✗ ERROR: {e}\n")
+            result = {"success": False, "productName": folder.name, "error": str(e)}
+        result["folder"] = str(folder)
+        return result
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = set()
+        while True:
+            while len(pending) < max(1, workers) and not (cancel_event and cancel_event.is_set()):
+                folder = next(folders, None)
+                if folder is None:
+                    break
+                pending.add(pool.submit(run, folder))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+def autopop_all_products(force: bool = False, workers: int = BATCH_WORKERS):
+    """Auto-populate all products in database"""
+    if not TOOLS_PATH.exists():
+        print(f"ERROR: Tools path not found: {TOOLS_PATH}")
+        return
+    
+    return list(autopop_batch(iter_product_folders(TOOLS_PATH), force=force, workers=workers))
 
 def main():
     """CLI entry point"""
@@ -450,6 +502,7 @@ def main():
     parser.add_argument('--all', action='store_true', help='Process all products')
     parser.add_argument('--product', type=str, help='Process specific product by name')
     parser.add_argument('--force', action='store_true', help='Force update even if data exists')
+    parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='Products processed in parallel (with --all)')
     
     args = parser.parse_args()
     
@@ -460,7 +513,7 @@ def main():
     
     if args.all:
         print("Processing all products...\n")
-        results = autopop_all_products(force=args.force)
+        results = autopop_all_products(force=args.force, workers=args.workers)
         
         success_count = sum(1 for r in results if r.get('success'))
         total_changes = sum(len(r.get('changes', [])) for r in results)
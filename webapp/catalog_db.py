@@ -0,0 +1,294 @@
+"""
+Catalog Database
+Optional local SQLite mirror of all product JSONs, with normalized tables for
+products, holders, previews and tags plus an FTS5 index over the text fields.
+
+The JSON files on the share stay the source of truth: the mirror is fed from
+the product cache (per-product on every change) and sync() reconciles it
+against the cache's stat signatures after a full scan.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id           INTEGER PRIMARY KEY,
+    folder       TEXT NOT NULL UNIQUE,
+    name         TEXT NOT NULL,
+    product_name TEXT,
+    json_path    TEXT,
+    range        TEXT,
+    category     TEXT,
+    subcategory  TEXT,
+    sku          TEXT,
+    cod_articol  TEXT,
+    description  TEXT,
+    notes        TEXT,
+    json_size    INTEGER,
+    json_mtime   REAL,
+    doc          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
+CREATE INDEX IF NOT EXISTS idx_products_product_name ON products(product_name);
+CREATE INDEX IF NOT EXISTS idx_products_range_category ON products(range, category);
+
+CREATE TABLE IF NOT EXISTS holders (
+    folder      TEXT NOT NULL,
+    idx         INTEGER NOT NULL,
+    variant     TEXT,
+    color       TEXT,
+    cod_articol TEXT,
+    file_name   TEXT,
+    full_path   TEXT,
+    preview     TEXT,
+    PRIMARY KEY (folder, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_holders_cod ON holders(cod_articol);
+CREATE INDEX IF NOT EXISTS idx_holders_variant_color ON holders(variant, color);
+CREATE INDEX IF NOT EXISTS idx_holders_file ON holders(file_name);
+
+CREATE TABLE IF NOT EXISTS previews (
+    folder    TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    file_name TEXT,
+    full_path TEXT,
+    PRIMARY KEY (folder, kind)
+);
+
+CREATE TABLE IF NOT EXISTS tags (
+    folder TEXT NOT NULL,
+    tag    TEXT NOT NULL,
+    PRIMARY KEY (folder, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
+
+-- rowid = products.id (declared, so VACUUM can't renumber it): a product's row is deleted by key, not by a scan
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    product_name,
+    sku,
+    cod_articol,
+    description,
+    tags,
+    notes,
+    tokenize = 'unicode61',
+    prefix = '2 3'
+);
+"""
+
+_FTS_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts5_available() -> bool:
+    try:
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else ('' if value is None else str(value))
+
+
+class CatalogMirror:
+    """SQLite mirror of the product cache"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                # Only a mirror: drop and rebuild from the share
+                for table in ('products', 'holders', 'previews', 'tags', 'products_fts'):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # === WRITES ===
+
+    def _delete(self, folder: str):
+        row = self._conn.execute("SELECT id FROM products WHERE folder = ?", (folder,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM products_fts WHERE rowid = ?", (row[0],))
+        for table in ('products', 'holders', 'previews', 'tags'):
+            self._conn.execute(f"DELETE FROM {table} WHERE folder = ?", (folder,))
+
+    def _upsert(self, folder: str, product: Dict[str, Any], signature=None):
+        self._delete(folder)
+        tags = [_text(t) for t in product.get('tags') or [] if t]
+        cursor = self._conn.execute(
+            """INSERT INTO products (folder, name, product_name, json_path, range, category, subcategory,
+                                     sku, cod_articol, description, notes, json_size, json_mtime, doc)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                folder,
+                os.path.basename(folder),
+                _text(product.get('productName')),
+                _text(product.get('_jsonPath')),
+                _text(product.get('range')),
+                _text(product.get('category')),
+                _text(product.get('subcategory')),
+                _text(product.get('sku')),
+                _text(product.get('codArticol')),
+                _text(product.get('description')),
+                _text(product.get('notes')),
+                signature[2] if signature else None,
+                signature[3] if signature else None,
+                json.dumps(product, ensure_ascii=False),
+            ),
+        )
+        for idx, holder in enumerate(product.get('holders') or []):
+            if not isinstance(holder, dict):
+                continue
+            self._conn.execute(
+                """INSERT INTO holders (folder, idx, variant, color, cod_articol, file_name, full_path, preview)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (folder, idx, _text(holder.get('variant')), _text(holder.get('color')),
+                 _text(holder.get('codArticol')), _text(holder.get('fileName')),
+                 _text(holder.get('fullPath')), _text(holder.get('preview'))),
+            )
+        previews = product.get('previews')
+        if isinstance(previews, dict):
+            for kind, preview in previews.items():
+                if isinstance(preview, dict):
+                    self._conn.execute(
+                        "INSERT INTO previews (folder, kind, file_name, full_path) VALUES (?, ?, ?, ?)",
+                        (folder, kind, _text(preview.get('fileName')), _text(preview.get('fullPath'))),
+                    )
+        for tag in set(tags):
+            self._conn.execute("INSERT INTO tags (folder, tag) VALUES (?, ?)", (folder, tag))
+        self._conn.execute(
+            """INSERT INTO products_fts (rowid, product_name, sku, cod_articol, description, tags, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (cursor.lastrowid, _text(product.get('productName')), _text(product.get('sku')),
+             _text(product.get('codArticol')), _text(product.get('description')),
+             ' '.join(tags), _text(product.get('notes'))),
+        )
+
+    def apply_changes(self, cache, changes: Optional[Dict[str, str]]):
+        """ProductCache listener: mirror only the products that changed"""
+        if changes is None:
+            self.sync(cache)
+            return
+        signatures = cache.signatures()
+        with self._lock:
+            for folder, status in changes.items():
+                product = cache.get(folder) if status != 'removed' else None
+                if product is None:
+                    self._delete(folder)
+                else:
+                    self._upsert(folder, product, signatures.get(folder))
+            self._conn.commit()
+
+    def sync(self, cache) -> Dict[str, int]:
+        """Reconcile the mirror with the cache by JSON size/mtime"""
+        products = cache.snapshot()
+        signatures = cache.signatures()
+        upserted = deleted = 0
+        with self._lock:
+            mirrored = {row['folder']: (row['json_path'], row['json_size'], row['json_mtime'])
+                        for row in self._conn.execute("SELECT folder, json_path, json_size, json_mtime FROM products")}
+            for folder in mirrored.keys() - products.keys():
+                self._delete(folder)
+                deleted += 1
+            for folder, product in products.items():
+                signature = signatures.get(folder)
+                if signature and mirrored.get(folder) == tuple(signature[1:]):
+                    continue
+                self._upsert(folder, product, signature)
+                upserted += 1
+            self._conn.commit()
+        if upserted or deleted:
+            print(f"🗄️  Catalog mirror synced: {upserted} upserted, {deleted} deleted")
+        return {"upserted": upserted, "deleted": deleted}
+
+    # === QUERIES ===
+
+    def get_product(self, name: str) -> Optional[Dict[str, Any]]:
+        """Full product document by folder name (or productName)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc FROM products WHERE name = ? UNION ALL "
+                "SELECT doc FROM products WHERE product_name = ? LIMIT 1",
+                (name, name),
+            ).fetchone()
+        return json.loads(row['doc']) if row else None
+
+    def search(self, q: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Full-text search (every word as a prefix, AND), best matches first"""
+        tokens = _FTS_TOKEN_RE.findall(q)
+        if not tokens:
+            return []
+        match = ' AND '.join('"' + token.replace('"', '""') + '"*' for token in tokens)
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT p.doc, bm25(products_fts) AS rank
+                   FROM products_fts JOIN products p ON p.id = products_fts.rowid
+                   WHERE products_fts MATCH ?
+                   ORDER BY rank LIMIT ?""",
+                (match, limit),
+            ).fetchall()
+        return [json.loads(row['doc']) for row in rows]
+
+    def holder_usage(self, variant: str = "", color: str = "", cod_articol: str = "",
+                     file_name: str = "") -> List[Dict[str, Any]]:
+        """Products that use a holder, matched on any of the given fields"""
+        clauses, params = [], []
+        for column, value in (('h.variant', variant), ('h.color', color),
+                              ('h.cod_articol', cod_articol), ('h.file_name', file_name)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if not clauses:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT p.name, p.product_name, p.range, p.category, h.idx, h.variant, h.color,
+                           h.cod_articol, h.file_name, h.full_path
+                    FROM holders h JOIN products p ON p.folder = h.folder
+                    WHERE {' AND '.join(clauses)}
+                    ORDER BY p.name, h.idx""",
+                params,
+            ).fetchall()
+        return [
+            {
+                "name": row['name'],
+                "productName": row['product_name'],
+                "range": row['range'],
+                "category": row['category'],
+                "holderIndex": row['idx'],
+                "variant": row['variant'],
+                "color": row['color'],
+                "codArticol": row['cod_articol'],
+                "fileName": row['file_name'],
+                "fullPath": row['full_path'],
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('products', 'holders', 'previews', 'tags')
+            }
@@ -0,0 +1,246 @@
+"""
+3D Preview Extractor
+Pulls the preview image Rhino embeds in a .3dm file and saves it as JPEG.
+
+The file is memory-mapped and only the start of the openNURBS chunk stream
+is walked: the 32-byte header, the start-section comment and the properties
+table, which holds the preview bitmap. The geometry tables that follow are
+never touched, so extracting the preview of a mesh of several hundred MB
+reads a few KB over the share.
+
+Chunk layout: a 4-byte typecode followed by a 4-byte (archive version < 50)
+or 8-byte (version >= 50) little-endian value. For "short" typecodes
+(TCODE_SHORT bit set) the value is the data; otherwise it is the length of
+the payload that follows. The preview is a Windows DIB (BITMAPINFOHEADER +
+palette + pixels), stored raw in TCODE_PROPERTIES_PREVIEWIMAGE or with the
+palette and pixels zlib-compressed in TCODE_PROPERTIES_COMPRESSED_PREVIEWIMAGE.
+"""
+import io
+import mmap
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Optional, Tuple
+
+from PIL import Image
+
+HEADER = b"3D Geometry File Format "
+HEADER_SIZE = 32
+
+# Typecodes as composed in opennurbs_3dm.h
+TCODE_SHORT = 0x80000000
+TCODE_CRC = 0x00008000  # payload ends with a 4-byte CRC (covered by the chunk length)
+TCODE_TABLE = 0x10000000
+TCODE_TABLEREC = 0x20000000
+TCODE_PROPERTIES_TABLE = TCODE_TABLE | 0x0014
+TCODE_PROPERTIES_PREVIEWIMAGE = TCODE_TABLEREC | TCODE_CRC | 0x0023
+TCODE_PROPERTIES_COMPRESSED_PREVIEWIMAGE = TCODE_TABLEREC | TCODE_CRC | 0x0025
+TCODE_ANONYMOUS_CHUNK = 0x40000000 | TCODE_CRC
+TCODE_ENDOFTABLE = 0xFFFFFFFF
+
+BITMAPINFOHEADER_SIZE = 40
+MAX_TOP_LEVEL_CHUNKS = 8  # the properties table comes right after the start section
+JPEG_QUALITY = 90
+
+
+class PreviewError(Exception):
+    """The file is not a readable .3dm or its preview is malformed"""
+
+
+def read_version(buf) -> int:
+    """Archive version from the 32-byte file header (1-4, or 50, 60, 70, ...)"""
+    if len(buf) < HEADER_SIZE or buf[:len(HEADER)] != HEADER:
+        raise PreviewError("Not a 3dm file")
+    try:
+        return int(bytes(buf[len(HEADER):HEADER_SIZE]).decode('ascii').strip())
+    except ValueError:
+        raise PreviewError("Bad 3dm version field")
+
+
+class _ChunkReader:
+    """Walks chunk headers over a buffer without copying payloads"""
+
+    def __init__(self, buf, version: int):
+        self.buf = buf
+        self.value_format = "<q" if version >= 50 else "<i"
+        self.header_size = 4 + struct.calcsize(self.value_format)
+
+    def chunk(self, offset: int, end: int) -> Tuple[int, int, int]:
+        """(typecode, value, payload offset) of the chunk at offset"""
+        if offset + self.header_size > end:
+            raise PreviewError("Truncated chunk header")
+        typecode = struct.unpack_from("<I", self.buf, offset)[0]
+        value = struct.unpack_from(self.value_format, self.buf, offset + 4)[0]
+        start = offset + self.header_size
+        if not typecode & TCODE_SHORT and (value < 0 or start + value > end):
+            raise PreviewError(f"Bad chunk length at offset {offset}")
+        return typecode, value, start
+
+    def chunks(self, offset: int, end: int):
+        """Yield (typecode, payload offset, payload length) until end or TCODE_ENDOFTABLE"""
+        while offset < end:
+            typecode, value, start = self.chunk(offset, end)
+            if typecode == TCODE_ENDOFTABLE:
+                return
+            if typecode & TCODE_SHORT:
+                offset = start
+                continue
+            yield typecode, start, value
+            offset = start + value
+
+
+def _find_preview_chunk(buf) -> Optional[Tuple[int, int, int, _ChunkReader]]:
+    """Locate the preview inside the properties table: (typecode, offset, length, reader)"""
+    reader = _ChunkReader(buf, read_version(buf))
+    top_level = reader.chunks(HEADER_SIZE, len(buf))
+    for _, (typecode, start, length) in zip(range(MAX_TOP_LEVEL_CHUNKS), top_level):
+        if typecode != TCODE_PROPERTIES_TABLE:
+            continue
+        found = None
+        for sub_typecode, sub_start, sub_length in reader.chunks(start, start + length):
+            if sub_typecode == TCODE_PROPERTIES_COMPRESSED_PREVIEWIMAGE:
+                return sub_typecode, sub_start, sub_length, reader
+            if sub_typecode == TCODE_PROPERTIES_PREVIEWIMAGE:
+                found = (sub_typecode, sub_start, sub_length, reader)
+        return found
+    return None
+
+
+def _bitmap_layout(header: bytes) -> Tuple[int, int]:
+    """(palette bytes, pixel bytes) described by a BITMAPINFOHEADER"""
+    (size, width, height, planes, bit_count, compression, size_image,
+     _, _, clr_used, _) = struct.unpack("<IiiHHIIiiII", header)
+    if size != BITMAPINFOHEADER_SIZE or width <= 0 or height == 0 or planes != 1:
+        raise PreviewError("Bad preview bitmap header")
+    if bit_count <= 8:
+        palette = (clr_used or (1 << bit_count)) * 4
+    else:
+        palette = clr_used * 4 + (12 if compression == 3 else 0)  # BI_BITFIELDS masks
+    pixels = size_image or ((width * bit_count + 31) // 32) * 4 * abs(height)
+    return palette, pixels
+
+
+def _read_compressed_buffer(buf, offset: int, end: int, reader: _ChunkReader) -> Tuple[bytes, int]:
+    """Read one ON_BinaryArchive compressed buffer: returns (data, next offset)"""
+    if offset + 4 > end:
+        raise PreviewError("Truncated compressed preview")
+    size = struct.unpack_from("<I", buf, offset)[0]
+    offset += 4
+    if size == 0:
+        return b"", offset
+    # crc32 of the uncompressed data (4 bytes), then the method: 0 = stored, 1 = zlib
+    if offset + 5 > end:
+        raise PreviewError("Truncated compressed preview")
+    method = buf[offset + 4]
+    offset += 5
+    if method == 0:
+        if offset + size > end:
+            raise PreviewError("Truncated compressed preview")
+        return bytes(buf[offset:offset + size]), offset + size
+    # The deflate stream sits in an anonymous chunk (with a trailing crc)
+    _, length, start = reader.chunk(offset, end)
+    inflater = zlib.decompressobj()
+    try:
+        data = inflater.decompress(buf[start:start + length], size)
+    except zlib.error as e:
+        raise PreviewError(f"Corrupt compressed preview: {e}")
+    if len(data) != size:
+        raise PreviewError("Compressed preview is shorter than declared")
+    return data, start + length
+
+
+def read_preview_dib(path) -> Optional[bytes]:
+    """The embedded preview as a packed DIB (BITMAPINFOHEADER + palette + pixels), or None"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER_SIZE:
+            raise PreviewError("Not a 3dm file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            found = _find_preview_chunk(buf)
+            if found is None:
+                return None
+            typecode, start, length, reader = found
+            end = start + length
+            header = bytes(buf[start:start + BITMAPINFOHEADER_SIZE])
+            if len(header) < BITMAPINFOHEADER_SIZE:
+                raise PreviewError("Truncated preview bitmap")
+            palette_size, pixels_size = _bitmap_layout(header)
+            offset = start + BITMAPINFOHEADER_SIZE
+
+            if typecode == TCODE_PROPERTIES_PREVIEWIMAGE:
+                body = bytes(buf[offset:offset + palette_size + pixels_size])
+                if len(body) < palette_size + pixels_size:
+                    raise PreviewError("Truncated preview bitmap")
+                return header + body
+
+            palette, offset = _read_compressed_buffer(buf, offset, end, reader)
+            pixels, _ = _read_compressed_buffer(buf, offset, end, reader)
+            return header + palette[:palette_size] + pixels
+
+
+def dib_to_image(dib: bytes) -> "Image.Image":
+    """Open a packed DIB with Pillow by prefixing a BITMAPFILEHEADER"""
+    palette_size, _ = _bitmap_layout(dib[:BITMAPINFOHEADER_SIZE])
+    file_header = struct.pack("<2sIHHI", b"BM", 14 + len(dib), 0, 0, 14 + BITMAPINFOHEADER_SIZE + palette_size)
+    return Image.open(io.BytesIO(file_header + dib))
+
+
+def extract_preview(src, dst) -> bool:
+    """Save the preview of src as a JPEG at dst.
+
+    Returns False if the file has no embedded preview; raises PreviewError
+    (or OSError) if it can't be read.
+    """
+    dib = read_preview_dib(src)
+    if dib is None:
+        return False
+    dst = Path(dst)
+    with dib_to_image(dib) as img:
+        img = img.convert("RGB")
+        tmp_path = dst.with_name(dst.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        img.save(tmp_path, "JPEG", quality=JPEG_QUALITY)
+    os.replace(tmp_path, dst)
+    return True
+
+
+def batch_extract_previews(path, recursive: bool = True, overwrite: bool = False) -> int:
+    """Extract previews for every .3dm under path in this process; returns how many were written.
+
+    The server runs extraction through preview_pipeline.run_pipeline (process
+    pool, progress); this is the simple sequential entry point for scripts.
+    """
+    from preview_pipeline import discover_3dm_files, is_up_to_date, preview_path_for
+
+    count = 0
+    for source in discover_3dm_files([Path(path)], recursive):
+        preview = preview_path_for(source)
+        if not overwrite and is_up_to_date(source, preview):
+            continue
+        try:
+            preview.parent.mkdir(parents=True, exist_ok=True)
+            if extract_preview(source, preview):
+                count += 1
+                print(f"  ✓ {preview.name}")
+        except (PreviewError, OSError) as e:
+            print(f"  ❌ {source.name}: {e}")
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract embedded previews from .3dm files")
+    parser.add_argument("path", help="A .3dm file or a folder to scan")
+    parser.add_argument("--no-recursive", action="store_true", help="Don't descend into subfolders")
+    parser.add_argument("--overwrite", action="store_true", help="Re-extract up-to-date previews")
+    args = parser.parse_args()
+
+    target = Path(args.path)
+    if target.is_file():
+        from preview_pipeline import preview_path_for
+        ok = extract_preview(target, preview_path_for(target))
+        print(f"✅ {preview_path_for(target)}" if ok else "⚠️  No embedded preview")
+    else:
+        total = batch_extract_previews(target, recursive=not args.no_recursive, overwrite=args.overwrite)
+        print(f"✅ Extracted {total} previews")
@@ -0,0 +1,175 @@
+"""
+Filesystem Watcher
+Watches TOOLS_PATH and applies targeted per-product invalidations to the
+product cache, so edits made from Rhino or Explorer show up within seconds
+without a full rescan.
+
+Uses watchdog (inotify / ReadDirectoryChangesW) when it is installed and
+falls back to polling with incremental refreshes, which also works on
+network shares that don't deliver change notifications. Those whole-tree
+refreshes go through the `refresh` callback when one is set, so the server
+can run them through its own refresh path (snapshot timestamp and save).
+"""
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+WATCHER_MODES = ("auto", "watchdog", "poll", "off")
+
+
+class _EventCollector(FileSystemEventHandler):
+    """Collects changed paths; the watcher thread drains them in batches"""
+
+    def __init__(self, watcher: "ProductWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory and event.event_type == 'modified':
+            return  # The child that changed reports its own event
+        self.watcher.notify_path(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.watcher.notify_path(dest_path)
+
+
+class ProductWatcher:
+    """Keeps a ProductCache fresh from filesystem events or polling"""
+
+    def __init__(self, cache, mode: str = "auto", poll_interval: float = 15.0, debounce: float = 1.0,
+                 refresh: Optional[Callable[[], Optional[Dict[str, Any]]]] = None):
+        if mode not in WATCHER_MODES:
+            raise ValueError(f"Unknown watcher mode: {mode}")
+        self.cache = cache
+        self.refresh = refresh  # incremental refresh of the whole tree (default: cache.refresh); may return stats
+        self.requested_mode = mode
+        self.mode = "off"
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._pending_folders: Set[Path] = set()
+        self._structure_changed = False
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+
+    @property
+    def tools_path(self) -> Path:
+        return self.cache.tools_path
+
+    def start(self):
+        """Start watching (no-op if mode is 'off' or TOOLS_PATH is unreachable)"""
+        if self.requested_mode == "off" or self._thread:
+            return
+        if not self.tools_path.exists():
+            print(f"⚠️  Watcher disabled: {self.tools_path} not found")
+            return
+
+        mode = self.requested_mode
+        if mode in ("auto", "watchdog"):
+            if Observer is None:
+                if mode == "watchdog":
+                    print("⚠️  watchdog not installed - falling back to polling")
+                mode = "poll"
+            else:
+                try:
+                    self._observer = Observer()
+                    self._observer.schedule(_EventCollector(self), str(self.tools_path), recursive=True)
+                    self._observer.start()
+                    mode = "watchdog"
+                except Exception as e:
+                    print(f"⚠️  watchdog failed to start ({e}) - falling back to polling")
+                    self._observer = None
+                    mode = "poll"
+
+        self.mode = mode
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="product-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 Watching {self.tools_path} ({self.mode})")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.mode = "off"
+
+    def notify_path(self, path: str):
+        """Map a changed path to its product folder and queue it.
+
+        Only the product folder itself and JSON files inside it matter;
+        meshes and previews being written don't change the product data.
+        """
+        try:
+            parts = Path(path).relative_to(self.tools_path).parts
+        except ValueError:
+            return
+        if any(part.startswith('_') for part in parts[:3]):
+            return
+
+        with self._pending_lock:
+            if len(parts) < 3:
+                # Range or category folder changed: let an incremental refresh sort it out
+                self._structure_changed = True
+            elif len(parts) == 3 or parts[-1].lower().endswith('.json'):
+                self._pending_folders.add(self.tools_path.joinpath(*parts[:3]))
+            else:
+                return
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.mode == "poll":
+                self._stop.wait(self.poll_interval)
+                if self._stop.is_set():
+                    break
+                try:
+                    stats = self._refresh()
+                    if stats and (stats["added"] or stats["changed"] or stats["removed"]):
+                        print(f"👀 Poll refresh: +{stats['added']} ~{stats['changed']} -{stats['removed']}")
+                except Exception as e:
+                    print(f"Warning: watcher poll refresh failed: {e}")
+                continue
+
+            self._wake.wait()
+            if self._stop.is_set():
+                break
+            # Let bursts of events (e.g. a save writing several files) settle
+            self._stop.wait(self.debounce)
+            self._wake.clear()
+            self._apply_pending()
+
+    def _refresh(self) -> Optional[Dict[str, Any]]:
+        return self.refresh() if self.refresh else self.cache.refresh()
+
+    def _apply_pending(self):
+        with self._pending_lock:
+            folders = self._pending_folders
+            structure_changed = self._structure_changed
+            self._pending_folders = set()
+            self._structure_changed = False
+
+        try:
+            if structure_changed:
+                self._refresh()
+                return
+            for folder in folders:
+                status = self.cache.refresh_folder(folder)
+                if status in ('added', 'changed', 'removed'):
+                    print(f"👀 {folder.name}: {status}")
+        except Exception as e:
+            print(f"Warning: watcher invalidation failed: {e}")
@@ -0,0 +1,302 @@
+"""
+Holder Catalog
+Index of the Holders tree (Holders/*.3dm, Holders/{category}/*.3dm and
+their Previews folders, plus the per-category {range}/{category}/Holders
+folders) shared by autopop and /api/holders.
+
+Every folder is listed once and kept as a name map, so resolving a holder
+file or preview is a dictionary lookup instead of a stat() per candidate
+path. Listings are revalidated by folder mtime at most every
+REFRESH_INTERVAL seconds; folders that don't exist are cached too.
+
+Holder preview requests (/api/holder-preview/{filename}) are answered from a
+filename index over the whole Holders tree; misses are cached for
+NEGATIVE_TTL seconds (at most MAX_MISSES names) so missing images don't
+trigger repeated sweeps. A new miss revalidates the folders at most once
+per MISS_REFRESH_INTERVAL, however many distinct names miss.
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+REFRESH_INTERVAL = 30.0  # seconds between mtime checks of the indexed folders
+NEGATIVE_TTL = 60.0       # seconds a preview miss is remembered
+MAX_MISSES = 5000         # remembered preview misses (oldest dropped first)
+MISS_REFRESH_INTERVAL = 5.0  # seconds between miss-triggered revalidations
+PREVIEW_EXTENSIONS = ('.png', '.jpg')
+
+# (folder mtime or None if missing, files name -> path, subfolders lowercase name -> path)
+_Listing = Tuple[Optional[float], Dict[str, str], Dict[str, str]]
+
+
+def parse_holder_name(file_name: str) -> Dict[str, str]:
+    """Split "{variant}_{color}_{codArticol}.3dm" into its parts"""
+    stem = file_name
+    while stem.lower().endswith('.3dm'):
+        stem = stem[:-4]
+    parts = stem.split('_')
+    if len(parts) >= 3:
+        return {"variant": parts[0], "color": parts[1], "codArticol": '_'.join(parts[2:])}
+    if len(parts) == 2:
+        return {"variant": parts[0], "color": parts[1], "codArticol": ""}
+    return {"variant": stem, "color": "", "codArticol": ""}
+
+
+def _list_dir(folder: Path) -> _Listing:
+    try:
+        mtime = os.stat(folder).st_mtime
+    except OSError:
+        return None, {}, {}
+    files: Dict[str, str] = {}
+    exact: Dict[str, str] = {}
+    dirs: Dict[str, str] = {}
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        dirs.setdefault(entry.name.lower(), str(folder / entry.name))
+                    elif entry.is_file():
+                        files.setdefault(entry.name.lower(), str(folder / entry.name))
+                        exact[entry.name] = str(folder / entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        return None, {}, {}
+    # Exact names win over a case-insensitive match
+    files.update(exact)
+    return mtime, files, dirs
+
+
+class HolderCatalog:
+    """Cached listings of the holder folders, revalidated by mtime"""
+
+    def __init__(self, tools_path: Path, refresh_interval: float = REFRESH_INTERVAL):
+        self.tools_path = Path(tools_path)
+        self.refresh_interval = refresh_interval
+        self.generation = 0
+        self._dirs: Dict[str, _Listing] = {}
+        self._checked_at = 0.0
+        self._preview_index: Optional[Dict[str, str]] = None  # file name -> path, whole Holders tree
+        self._missing: Dict[str, float] = {}                  # preview name -> time of the miss, oldest first
+        self._miss_refreshed_at = float('-inf')               # last miss-triggered revalidation
+        self._lock = threading.RLock()
+
+    @property
+    def holders_path(self) -> Path:
+        return self.tools_path / "Holders"
+
+    # === LISTINGS ===
+
+    def _dir(self, folder: Path) -> _Listing:
+        key = str(folder)
+        with self._lock:
+            listing = self._dirs.get(key)
+            if listing is None:
+                listing = _list_dir(folder)
+                self._dirs[key] = listing
+            return listing
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-list folders whose mtime changed; returns how many did"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.refresh_interval:
+                return 0
+            self._checked_at = now
+            changed = 0
+            for key, (mtime, _, _) in list(self._dirs.items()):
+                try:
+                    current = os.stat(key).st_mtime
+                except OSError:
+                    current = None
+                if current != mtime:
+                    self._dirs[key] = _list_dir(Path(key))
+                    changed += 1
+            if changed:
+                self.generation += 1
+                self._preview_index = None
+                self._missing = {}
+            return changed
+
+    def invalidate(self):
+        with self._lock:
+            self._dirs = {}
+            self._checked_at = 0.0
+            self._preview_index = None
+            self._missing = {}
+            self.generation += 1
+
+    @staticmethod
+    def _lookup(files: Dict[str, str], name: str) -> Optional[str]:
+        return files.get(name) or files.get(name.lower())
+
+    def _previews_dir(self, parent: Path) -> Optional[Path]:
+        """The Previews/previews subfolder of a holders folder, if any"""
+        _, _, dirs = self._dir(parent)
+        path = dirs.get('previews')
+        return Path(path) if path else None
+
+    # === LOOKUPS ===
+
+    def find_holder_file(self, category_folder: Path, file_names: List[str]) -> Optional[Path]:
+        """Resolve a holder .3dm for a product in category_folder.
+
+        Searches Holders/{category}, then {range}/{category}/Holders, then the
+        root Holders folder, trying each candidate file name in turn.
+        """
+        self.refresh()
+        search_paths = [
+            self.holders_path / category_folder.name,  # Central Holders/{category} (PRIMARY)
+            category_folder / "Holders",               # Same category
+            self.holders_path                          # Root Holders folder (fallback)
+        ]
+        for search_path in search_paths:
+            _, files, _ = self._dir(search_path)
+            for name in file_names:
+                path = self._lookup(files, name)
+                if path:
+                    return Path(path)
+        return None
+
+    def find_holder_preview(self, category_folder: Path, names: List[str]) -> Optional[Path]:
+        """Resolve a holder preview image for a product in category_folder"""
+        self.refresh()
+        for parent in (category_folder / "Holders", self.holders_path / category_folder.name):
+            previews = self._previews_dir(parent)
+            if previews is None:
+                continue
+            _, files, _ = self._dir(previews)
+            for name in names:
+                path = self._lookup(files, name)
+                if path:
+                    return Path(path)
+        return None
+
+    def _preview_for(self, files: Dict[str, str], info: Dict[str, str]) -> Optional[str]:
+        stems = [f"{info['variant']}_{info['color']}_{info['codArticol']}", f"{info['variant']}_{info['color']}"]
+        for stem in stems:
+            for ext in PREVIEW_EXTENSIONS:
+                path = self._lookup(files, stem + ext)
+                if path:
+                    return path
+        return None
+
+    def _build_preview_index(self) -> Dict[str, str]:
+        """File name -> path for every file under Holders.
+
+        Files in a category's Previews folder win over same-named files
+        elsewhere in the tree. Uses (and fills) the cached folder listings.
+        """
+        index: Dict[str, str] = {}
+        stack = [self.holders_path]
+        while stack:
+            folder = stack.pop()
+            _, files, dirs = self._dir(folder)
+            for name, path in files.items():
+                index.setdefault(name, path)
+            stack.extend(Path(path) for _, path in sorted(dirs.items(), reverse=True))
+
+        _, _, categories = self._dir(self.holders_path)
+        for _, path in sorted(categories.items(), reverse=True):
+            if Path(path).name.startswith('_'):
+                continue
+            previews = self._previews_dir(Path(path))
+            if previews is not None:
+                index.update(self._dir(previews)[1])
+        return index
+
+    def find_preview(self, file_name: str) -> Optional[Path]:
+        """Resolve a holder preview by file name anywhere under Holders"""
+        self.refresh()
+        with self._lock:
+            if self._preview_index is None:
+                self._preview_index = self._build_preview_index()
+            path = self._lookup(self._preview_index, file_name)
+            if path:
+                return Path(path)
+
+            missed_at = self._missing.get(file_name)
+            if missed_at is not None and time.monotonic() - missed_at < NEGATIVE_TTL:
+                return None
+
+            # First miss (or an expired one): the file may be new, so revalidate -
+            # but only once per MISS_REFRESH_INTERVAL for all the names that miss
+            now = time.monotonic()
+            revalidate = now - self._miss_refreshed_at >= MISS_REFRESH_INTERVAL
+            if revalidate:
+                self._miss_refreshed_at = now
+
+        if revalidate and self.refresh(force=True):
+            with self._lock:
+                if self._preview_index is None:
+                    self._preview_index = self._build_preview_index()
+                path = self._lookup(self._preview_index, file_name)
+                if path:
+                    return Path(path)
+        with self._lock:
+            self._remember_miss(file_name)
+        return None
+
+    def _remember_miss(self, file_name: str):
+        """Record a miss; drops expired and then oldest misses beyond MAX_MISSES. Call with _lock held."""
+        now = time.monotonic()
+        self._missing.pop(file_name, None)
+        self._missing[file_name] = now
+        if len(self._missing) <= MAX_MISSES:
+            return
+        for name, missed_at in list(self._missing.items()):
+            if len(self._missing) <= MAX_MISSES and now - missed_at < NEGATIVE_TTL:
+                break
+            del self._missing[name]
+
+    def holders(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every holder .3dm in the Holders tree with its parsed parts and preview.
+
+        Root holders have category "". Pass category to list one folder only.
+        """
+        self.refresh()
+        _, root_files, root_dirs = self._dir(self.holders_path)
+        folders: List[Tuple[str, Dict[str, str], Dict[str, str]]] = []
+        if category is None or category == "":
+            folders.append(("", root_files, {}))
+        for name_lower, path in sorted(root_dirs.items()):
+            folder = Path(path)
+            if folder.name.startswith('_') or name_lower == 'previews':
+                continue
+            if category and folder.name.lower() != category.lower():
+                continue
+            _, files, _ = self._dir(folder)
+            previews = self._previews_dir(folder)
+            preview_files = self._dir(previews)[1] if previews else {}
+            folders.append((folder.name, files, preview_files))
+
+        holders = []
+        for category_name, files, preview_files in folders:
+            seen = set()
+            for path in sorted(files.values()):
+                if path in seen or not path.lower().endswith('.3dm'):
+                    continue
+                seen.add(path)
+                file_name = Path(path).name
+                info = parse_holder_name(file_name)
+                holders.append({
+                    "fileName": file_name,
+                    "fullPath": path.replace('\\', '/'),
+                    "category": category_name,
+                    **info,
+                    "preview": self._preview_for(preview_files, info) or "",
+                })
+        return holders
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "folders": len(self._dirs),
+                "missingFolders": sum(1 for mtime, _, _ in self._dirs.values() if mtime is None),
+                "previewFiles": len(self._preview_index) if self._preview_index is not None else None,
+                "cachedMisses": len(self._missing),
+                "generation": self.generation,
+            }
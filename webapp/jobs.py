@@ -0,0 +1,278 @@
+"""
+Background Jobs
+Runs long operations (scan, preview extraction, batch auto-populate) on a
+bounded executor instead of inside the HTTP request; clients submit a job
+and poll /api/jobs/{id}.
+
+Each job kind has a concurrency limit, identical queued/running jobs are
+deduplicated, and job state is persisted to a JSON file so history survives
+restarts (queued jobs are resumed, interrupted ones are marked failed).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_WORKERS = 2
+MAX_HISTORY = 200  # finished jobs kept (oldest dropped first)
+PROGRESS_SAVE_INTERVAL = 5.0  # seconds between state-file writes for progress-only updates
+
+PENDING_STATES = ("queued", "running")
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised by a job function that stops early because cancel was requested"""
+
+
+class Job:
+    """One unit of background work and its observable state"""
+
+    def __init__(self, kind: str, params: Dict[str, Any], requested_by: Optional[Dict[str, str]] = None,
+                 job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params
+        self.requested_by = requested_by or {}
+        self.state = "queued"
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()  # set on cancel; hand it to workers that poll an Event
+        self._scheduler: Optional["JobScheduler"] = None
+
+    @property
+    def dedup_key(self) -> str:
+        return self.kind + ":" + json.dumps(self.params, sort_keys=True, default=str)
+
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancel was requested (call between work items)"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def set_progress(self, done: int, total: Optional[int] = None, message: str = ""):
+        self.progress = {"done": done, "total": total, "message": message}
+        if self._scheduler:
+            self._scheduler._save(throttle=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "requestedBy": self.requested_by,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "cancelRequested": self.cancel_event.is_set(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        job = cls(data["kind"], data.get("params") or {}, data.get("requestedBy"), data["id"])
+        job.state = data.get("state", "failed")
+        job.progress = data.get("progress") or {}
+        job.result = data.get("result")
+        job.error = data.get("error")
+        job.created_at = data.get("createdAt") or time.time()
+        job.started_at = data.get("startedAt")
+        job.finished_at = data.get("finishedAt")
+        return job
+
+
+class JobScheduler:
+    """Bounded executor with per-kind limits, dedup and a persisted job table"""
+
+    def __init__(self, state_file: Path, workers: int = DEFAULT_WORKERS):
+        self.state_file = Path(state_file)
+        self.workers = workers
+        self._handlers: Dict[str, Tuple[Callable[[Job], Any], int]] = {}
+        self._jobs: Dict[str, Job] = {}  # insertion order = submission order
+        self._running: Dict[str, int] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.RLock()
+        self._saved_at = 0.0
+        self._loaded = False
+        self._closed = False  # set by shutdown(): nothing new is started after it
+
+    def register(self, kind: str, func: Callable[[Job], Any], limit: int = 1):
+        """Register a job kind: func(job) returns the job result; limit = max concurrent"""
+        self._handlers[kind] = (func, max(1, limit))
+
+    # === PERSISTENCE ===
+
+    def load(self):
+        """Restore the job table: resume queued jobs, fail the ones a restart interrupted"""
+        with self._lock:
+            self._loaded = True
+            if not self.state_file.exists():
+                return
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Failed to load job state: {e}")
+                return
+            resumed = 0
+            for data in saved.get("jobs", []):
+                try:
+                    job = Job.from_dict(data)
+                except (KeyError, TypeError):
+                    continue
+                if job.state == "running":
+                    job.state = "failed"
+                    job.error = "Interrupted by server restart"
+                    job.finished_at = job.finished_at or time.time()
+                elif job.state == "queued":
+                    resumed += 1
+                job._scheduler = self
+                self._jobs[job.id] = job
+            if resumed:
+                print(f"📋 Resuming {resumed} queued job(s)")
+        self._dispatch()
+
+    def _save(self, throttle: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if throttle and now - self._saved_at < PROGRESS_SAVE_INTERVAL:
+                return
+            self._saved_at = now
+            data = {"jobs": [job.to_dict() for job in self._jobs.values()]}
+            try:
+                self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.state_file.with_name(self.state_file.name + ".tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, default=str)
+                os.replace(tmp_path, self.state_file)
+            except (OSError, TypeError) as e:
+                print(f"Warning: Failed to save job state: {e}")
+
+    def _trim_history(self):
+        finished = [job for job in self._jobs.values() if job.state in FINISHED_STATES]
+        for job in finished[:max(0, len(finished) - MAX_HISTORY)]:
+            del self._jobs[job.id]
+
+    # === SUBMISSION ===
+
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None,
+               requested_by: Optional[Dict[str, str]] = None) -> Tuple[Job, bool]:
+        """Queue a job; returns (job, created). An identical pending job is reused."""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(kind, params or {}, requested_by)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Job scheduler is shut down")
+            for existing in self._jobs.values():
+                if (existing.state in PENDING_STATES and not existing.cancelled()
+                        and existing.dedup_key == job.dedup_key):
+                    return existing, False
+            job._scheduler = self
+            self._jobs[job.id] = job
+            self._save()
+        self._dispatch()
+        return job, True
+
+    def _dispatch(self):
+        """Start queued jobs while there are free workers and per-kind slots"""
+        with self._lock:
+            if not self._loaded or self._closed:
+                return
+            running_total = sum(self._running.values())
+            for job in list(self._jobs.values()):
+                if running_total >= self.workers:
+                    break
+                if job.state != "queued":
+                    continue
+                handler = self._handlers.get(job.kind)
+                if handler is None:
+                    continue  # Kind not registered (yet) in this process
+                if self._running.get(job.kind, 0) >= handler[1]:
+                    continue
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="jobs")
+                job.state = "running"
+                job.started_at = time.time()
+                self._running[job.kind] = self._running.get(job.kind, 0) + 1
+                running_total += 1
+                self._pool.submit(self._run, job, handler[0])
+            self._save()
+
+    def _run(self, job: Job, func: Callable[[Job], Any]):
+        print(f"⚙️  Job {job.id} ({job.kind}) started")
+        try:
+            result = func(job)
+            job.result = result
+            job.state = "cancelled" if job.cancelled() else "succeeded"
+        except JobCancelled:
+            job.state = "cancelled"
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            print(f"❌ Job {job.id} ({job.kind}) failed: {e}")
+        job.finished_at = time.time()
+        print(f"⚙️  Job {job.id} ({job.kind}) {job.state} in {job.finished_at - job.started_at:.1f}s")
+        with self._lock:
+            self._running[job.kind] -= 1
+            self._trim_history()
+            self._save()
+        self._dispatch()
+
+    # === QUERIES / CONTROL ===
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None, state: Optional[str] = None, limit: int = 50) -> List[Job]:
+        """Most recent first"""
+        with self._lock:
+            jobs = [job for job in reversed(list(self._jobs.values()))
+                    if (not kind or job.kind == kind) and (not state or job.state == state)]
+        return jobs[:limit]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job now, or ask a running one to stop"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED_STATES:
+                return job
+            job.cancel_event.set()
+            if job.state == "queued":
+                job.state = "cancelled"
+                job.finished_at = time.time()
+            self._save()
+        return job
+
+    def shutdown(self):
+        """Ask running jobs to stop and persist the table"""
+        with self._lock:
+            self._closed = True
+            for job in self._jobs.values():
+                if job.state == "running":
+                    job.cancel_event.set()
+            pool, self._pool = self._pool, None
+            self._save()
+        if pool:
+            pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {"workers": self.workers, "running": dict(self._running), "states": states}
@@ -0,0 +1,179 @@
+"""
+Payload Cache
+Keeps pre-serialized and pre-compressed JSON bodies per cache generation so
+hot listing endpoints don't re-encode the whole catalog on every hit, and
+answers If-None-Match revalidations with 304. Streamed bodies (NDJSON
+listings) get the same treatment: compressed chunk by chunk and tagged by
+generation.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import uuid
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Generations restart with the process, so generation-based ETags carry this too
+INSTANCE_ID = uuid.uuid4().hex[:8]
+
+
+def dumps(data: Any) -> bytes:
+    """Compact UTF-8 JSON, same output as FastAPI's JSONResponse"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class Payload:
+    """One serialized body with lazily built compressed variants"""
+
+    def __init__(self, generation: int, body: bytes):
+        self.generation = generation
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        with self._lock:
+            if encoding not in self._encoded:
+                if encoding == 'br':
+                    self._encoded[encoding] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+                else:
+                    self._encoded[encoding] = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+            return self._encoded[encoding]
+
+    def tag(self, encoding: Optional[str] = None) -> str:
+        # Strong ETag per representation; all variants revalidate each other
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        return _etag_matches(if_none_match, self.etag)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether If-None-Match names etag in any encoding variant"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate.strip('"').split('-')[0] == etag:
+            return True
+    return False
+
+
+class PayloadCache:
+    """Serialized payloads keyed by name, rebuilt when the generation moves.
+
+    A miss serializes the whole body: call get() off the event loop.
+    """
+
+    def __init__(self):
+        self._payloads: Dict[str, Payload] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, generation: int, build: Callable[[], Any]) -> Payload:
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None and payload.generation == generation:
+                return payload
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        # Build outside the cache lock (other keys stay servable), once per key
+        with build_lock:
+            with self._lock:
+                payload = self._payloads.get(key)
+            if payload is None or payload.generation != generation:
+                payload = Payload(generation, dumps(build()))
+                with self._lock:
+                    current = self._payloads.get(key)
+                    if current is None or current.generation <= generation:
+                        self._payloads[key] = payload
+            return payload
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+
+
+def pick_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+    if 'br' in accepted and brotli is not None:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def payload_response(request: Request, payload: Payload, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve a payload: 304 on a matching If-None-Match, else the best encoding"""
+    encoding = pick_encoding(request.headers.get('accept-encoding', ''))
+    response_headers = {
+        'ETag': payload.tag(encoding),
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    response_headers.update(headers or {})
+
+    if payload.matches(request.headers.get('if-none-match')):
+        return Response(status_code=304, headers=response_headers)
+
+    if encoding:
+        response_headers['Content-Encoding'] = encoding
+        return Response(content=payload.encoded(encoding), media_type='application/json', headers=response_headers)
+    return Response(content=payload.body, media_type='application/json', headers=response_headers)
+
+
+def _encode_stream(chunks: Iterable[str], encoding: Optional[str]) -> Iterator[bytes]:
+    """UTF-8 encode chunks, compressing with a sync flush after each so every chunk reaches the client"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            yield compressor.process(chunk.encode('utf-8')) + compressor.flush()
+        yield compressor.finish()
+    elif encoding == 'gzip':
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    else:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+
+
+def stream_response(request: Request, key: str, generation: int, chunks: Callable[[], Iterable[str]],
+                    media_type: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Stream a generated body, compressed per chunk and ETag-validated by generation.
+
+    chunks is only called when the body is actually sent, so a matching
+    If-None-Match costs nothing to answer.
+    """
+    etag = hashlib.sha1(f"{INSTANCE_ID}:{key}:{generation}".encode('utf-8')).hexdigest()[:20]
+    encoding = pick_encoding(request.headers.get('accept-encoding', ''))
+    response_headers = {
+        'ETag': f'"{etag}-{encoding}"' if encoding else f'"{etag}"',
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    response_headers.update(headers or {})
+
+    if _etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=response_headers)
+
+    if encoding:
+        response_headers['Content-Encoding'] = encoding
+    return StreamingResponse(_encode_stream(chunks(), encoding), media_type=media_type, headers=response_headers)
@@ -0,0 +1,149 @@
+"""
+Preview Extraction Pipeline
+Extracts the embedded preview of every .3dm file under one or more folders.
+
+The folders are walked once to collect .3dm files; files whose preview is
+already newer than the source are skipped before any work is scheduled, so
+reruns only touch what changed. The rest are extracted on a thread pool,
+one file per task: reading the thumbnail chunk out of each (often remote)
+.3dm is I/O-bound and Pillow releases the GIL while decoding/encoding, so
+threads keep up without spawning worker processes (which on Windows
+re-import the server module in every child).
+
+Previews are written next to the source as {stem}.jpg; for holder files
+(anything under a Holders folder) they go to the sibling Previews folder,
+where autopop and /api/holder-preview look for them.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+PREVIEW_SUFFIX = ".jpg"
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)  # same default as ThreadPoolExecutor
+MAX_REPORTED_FAILURES = 100  # failures listed in the result (all are counted)
+
+
+def preview_path_for(source: Path) -> Path:
+    """Where the preview of a .3dm file is written"""
+    if any(part.lower() == "holders" for part in source.parent.parts):
+        return source.parent / "Previews" / (source.stem + PREVIEW_SUFFIX)
+    return source.with_suffix(PREVIEW_SUFFIX)
+
+
+def discover_3dm_files(roots: Iterable[Path], recursive: bool = True) -> List[Path]:
+    """Every .3dm file under roots (one directory walk, folders starting with "_" skipped)"""
+    found: List[Path] = []
+    seen = set()
+    stack = [Path(root) for root in roots]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            if recursive and not entry.name.startswith('_'):
+                                stack.append(Path(entry.path))
+                        elif entry.name.lower().endswith('.3dm') and entry.path not in seen:
+                            seen.add(entry.path)
+                            found.append(Path(entry.path))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    found.sort()
+    return found
+
+
+def is_up_to_date(source: Path, preview: Path) -> bool:
+    """True if the preview exists and is at least as new as the source"""
+    try:
+        return os.stat(preview).st_mtime >= os.stat(source).st_mtime
+    except OSError:
+        return False
+
+
+def _extract_one(source: str, preview: str) -> Tuple[str, Optional[bool], Optional[str]]:
+    """Worker task: (source, written?, error). written is False if the file has no preview."""
+    try:
+        from extract_3d_previews import extract_preview
+        Path(preview).parent.mkdir(parents=True, exist_ok=True)
+        return source, bool(extract_preview(source, preview)), None
+    except Exception as e:
+        return source, None, f"{type(e).__name__}: {e}"
+
+
+def run_pipeline(roots: Iterable[Path], recursive: bool = True, overwrite: bool = False,
+                 workers: Optional[int] = None, cancel_event=None,
+                 progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+    """Extract previews for every .3dm under roots.
+
+    Args:
+        roots: Folders to scan
+        recursive: Descend into subfolders
+        overwrite: Re-extract even if the preview is newer than the source
+        workers: Worker threads (default: DEFAULT_WORKERS)
+        cancel_event: threading.Event; when set, pending files are dropped
+        progress: Called as progress(done, total, file_name) after each file
+
+    Returns:
+        Totals (discovered, skipped, extracted, noPreview, failed), up to
+        MAX_REPORTED_FAILURES per-file failures, elapsed seconds and files/s
+    """
+    started = time.monotonic()
+    sources = discover_3dm_files(roots, recursive)
+    discovered_at = time.monotonic()
+
+    pending = []
+    for source in sources:
+        preview = preview_path_for(source)
+        if overwrite or not is_up_to_date(source, preview):
+            pending.append((source, preview))
+
+    stats: Dict[str, Any] = {
+        "discovered": len(sources),
+        "skipped": len(sources) - len(pending),
+        "extracted": 0,
+        "noPreview": 0,
+        "failed": 0,
+        "cancelled": 0,
+        "failures": [],
+    }
+    total = len(pending)
+    if progress:
+        progress(0, total, "")
+
+    if pending:
+        workers = max(1, min(workers or DEFAULT_WORKERS, total))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="previews") as pool:
+            futures = [pool.submit(_extract_one, str(source), str(preview)) for source, preview in pending]
+            done = 0
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    stats["cancelled"] = sum(1 for f in futures if f.cancel())
+                if future.cancelled():
+                    continue
+                source, written, error = future.result()
+                done += 1
+                if error:
+                    stats["failed"] += 1
+                    if len(stats["failures"]) < MAX_REPORTED_FAILURES:
+                        stats["failures"].append({"file": source, "error": error})
+                elif written:
+                    stats["extracted"] += 1
+                else:
+                    stats["noPreview"] += 1
+                if progress:
+                    progress(done, total, Path(source).name)
+
+    elapsed = time.monotonic() - started
+    processed = stats["extracted"] + stats["noPreview"] + stats["failed"]
+    stats["discoverSeconds"] = round(discovered_at - started, 3)
+    stats["seconds"] = round(elapsed, 3)
+    stats["filesPerSecond"] = round(processed / elapsed, 1) if elapsed > 0 else None
+    stats["workers"] = workers if pending else 0
+    print(f"🖼️  Previews: {stats['extracted']} extracted, {stats['skipped']} up to date, "
+          f"{stats['failed']} failed of {stats['discovered']} files in {elapsed:.1f}s")
+    return stats
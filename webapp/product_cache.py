@@ -0,0 +1,491 @@
+"""
+Product Cache
+Keeps the product list in memory together with a stat signature per product
+folder, so a refresh only re-reads the JSON files that were added, changed or
+removed instead of re-parsing the whole network share.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Concurrent directory listings/JSON reads; SMB latency, not CPU, is the limit
+DEFAULT_WORKERS = 16
+
+SNAPSHOT_VERSION = 1
+
+# (folder mtime, JSON path, JSON size, JSON mtime)
+Signature = Tuple[float, str, int, float]
+
+
+def _list_subfolders(folder: str) -> List[Tuple[str, float]]:
+    """List visible subfolders of a folder as (path, mtime) pairs.
+
+    Uses os.scandir so that on Windows/SMB the folder mtimes come back with
+    the directory listing instead of costing one extra round trip each.
+    """
+    subfolders = []
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.name.startswith('_'):
+                    continue
+                try:
+                    if entry.is_dir():
+                        subfolders.append((entry.path, entry.stat().st_mtime))
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"Error listing {folder}: {e}")
+    return subfolders
+
+
+def _find_json(product_folder: str) -> Optional[str]:
+    """Return the first JSON file in a product folder (same rule as the scanner)"""
+    json_files = list(Path(product_folder).glob("*.json"))
+    return str(json_files[0]) if json_files else None
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def read_product_json(product_folder: str, json_path: str) -> Dict[str, Any]:
+    """Load a product JSON and tag it with its folder and JSON path"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['_folder'] = str(product_folder)
+    data['_jsonPath'] = str(json_path)
+    return data
+
+
+class ProductCache:
+    """In-memory product list with per-product stat signatures"""
+
+    def __init__(self, tools_path: Path, workers: int = DEFAULT_WORKERS):
+        self.tools_path = Path(tools_path)
+        self.workers = max(1, workers)
+        self.timestamp = 0.0
+        self.generation = 0  # Bumped after every change notification's listeners have run
+        self.last_refresh: Dict[str, Any] = {}
+        self._products: Dict[str, Dict[str, Any]] = {}  # folder -> product data
+        self._signatures: Dict[str, Signature] = {}     # folder -> signature
+        self._by_name: Dict[str, Tuple[str, str]] = {}  # product name -> (folder, JSON path)
+        self._scanned = False
+        self._listeners: List[Callable[[Optional[Dict[str, str]]], None]] = []
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()  # One scan/refresh at a time (server, watcher)
+
+    @property
+    def products(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._products.values())
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def get(self, folder: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._products.get(str(folder))
+
+    def signatures(self) -> Dict[str, Signature]:
+        with self._lock:
+            return dict(self._signatures)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of the folder -> product mapping (cache order)"""
+        with self._lock:
+            return dict(self._products)
+
+    def add_listener(self, callback: Callable[[Optional[Dict[str, str]]], None]):
+        """Register a callback run after every cache change.
+
+        It receives {folder: 'added' | 'changed' | 'removed'}, or None after a
+        full scan when everything must be considered changed.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, changes: Optional[Dict[str, str]]):
+        for callback in self._listeners:
+            try:
+                callback(changes)
+            except Exception as e:
+                print(f"Warning: product cache listener failed: {e}")
+        # Bumped only once every derived view is updated: a payload built and
+        # cached under the new generation can't come from the old data
+        with self._lock:
+            self.generation += 1
+
+    def lookup(self, name: str) -> Optional[Tuple[str, str]]:
+        """Resolve a product name to (folder, JSON path) without touching the share"""
+        with self._lock:
+            return self._by_name.get(name)
+
+    def remember(self, name: str, folder: str, json_path: str):
+        """Point a product name at a folder (used by create/update/rename)"""
+        with self._lock:
+            self._by_name[name] = (str(folder), str(json_path))
+
+    def forget(self, name: str):
+        with self._lock:
+            self._by_name.pop(name, None)
+
+    def _rebuild_name_index(self):
+        """Index every product by folder name and by its JSON productName"""
+        by_name: Dict[str, Tuple[str, str]] = {}
+        for folder, signature in self._signatures.items():
+            entry = (folder, signature[1])
+            data = self._products.get(folder)
+            if data and isinstance(data.get('productName'), str):
+                by_name.setdefault(data['productName'], entry)
+            by_name[os.path.basename(folder)] = entry  # Folder name wins on clashes
+        self._by_name = by_name
+
+    def _walk(self, pool: ThreadPoolExecutor, timings: Dict[str, float]) -> List[Tuple[str, float]]:
+        """List every {RANGE}/{CATEGORY}/{Product} folder as (path, mtime).
+
+        Range and category folders are listed concurrently so the walk costs
+        roughly three round trips instead of one per folder.
+        """
+        if not self.tools_path.exists():
+            return []
+
+        t = time.time()
+        range_folders = [path for path, _ in _list_subfolders(str(self.tools_path))]
+        timings["list_ranges"] = round(time.time() - t, 3)
+
+        t = time.time()
+        category_folders = [path for listing in pool.map(_list_subfolders, range_folders)
+                            for path, _ in listing]
+        timings["list_categories"] = round(time.time() - t, 3)
+
+        t = time.time()
+        product_folders = [entry for listing in pool.map(_list_subfolders, category_folders)
+                           for entry in listing]
+        timings["list_products"] = round(time.time() - t, 3)
+
+        return product_folders
+
+    def _load(self, folder: str, folder_mtime: float, json_path: str,
+              st: Optional[os.stat_result] = None) -> Tuple[Optional[Signature], Optional[Dict]]:
+        """Stat and read one product JSON, returning its new signature and data"""
+        st = st or _stat(json_path)
+        if st is None:
+            return None, None
+        signature = (folder_mtime, json_path, st.st_size, st.st_mtime)
+        try:
+            return signature, read_product_json(folder, json_path)
+        except Exception as e:
+            # Remember the signature so a broken JSON is only re-read once it changes
+            print(f"Error reading {json_path}: {e}")
+            return signature, None
+
+    def _scan_one(self, entry: Tuple[str, float]) -> Tuple[str, Optional[Signature], Optional[Dict]]:
+        folder, folder_mtime = entry
+        json_path = _find_json(folder)
+        if not json_path:
+            return folder, None, None
+        return (folder,) + self._load(folder, folder_mtime, json_path)
+
+    def _check_one(self, entry: Tuple[str, float], old: Optional[Signature]) -> Tuple[str, str, Optional[Signature], Optional[Dict]]:
+        """Compare one product folder with its old signature.
+
+        Returns (status, folder, signature, data) where status is one of
+        'gone', 'unchanged', 'touched', 'changed' or 'added'.
+        """
+        folder, folder_mtime = entry
+
+        if old and old[0] == folder_mtime:
+            json_path, st = old[1], _stat(old[1])
+            if st is None:
+                # JSON vanished although the folder mtime didn't move; re-glob
+                json_path = _find_json(folder)
+                st = _stat(json_path) if json_path else None
+        else:
+            json_path = _find_json(folder)
+            st = _stat(json_path) if json_path else None
+
+        if st is None:
+            return 'gone', folder, None, None
+
+        if old and old[1:] == (json_path, st.st_size, st.st_mtime):
+            if old[0] != folder_mtime:
+                return 'touched', folder, (folder_mtime,) + old[1:], None
+            return 'unchanged', folder, old, None
+
+        signature, data = self._load(folder, folder_mtime, json_path, st)
+        if signature is None:
+            return 'gone', folder, None, None
+        return ('changed' if old else 'added'), folder, signature, data
+
+    def full_scan(self) -> Dict[str, Any]:
+        """Discard everything and re-read every product JSON on the share"""
+        with self._refresh_lock:
+            return self._full_scan()
+
+    def _full_scan(self) -> Dict[str, Any]:
+        start = time.time()
+        timings: Dict[str, float] = {}
+        products: Dict[str, Dict[str, Any]] = {}
+        signatures: Dict[str, Signature] = {}
+        with self._lock:
+            old_signatures = dict(self._signatures)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            product_folders = self._walk(pool, timings)
+
+            t = time.time()
+            for folder, signature, data in pool.map(self._scan_one, product_folders):
+                if signature:
+                    signatures[folder] = signature
+                if data is not None:
+                    products[folder] = data
+            timings["read_json"] = round(time.time() - t, 3)
+
+        with self._lock:
+            # Keep products written through put() while the scan ran
+            for folder, signature in self._signatures.items():
+                if old_signatures.get(folder) != signature and folder in self._products:
+                    signatures[folder] = signature
+                    products[folder] = self._products[folder]
+            self._products = products
+            self._signatures = signatures
+            self._scanned = True
+            self._rebuild_name_index()
+            self.timestamp = time.time()
+            self.last_refresh = {
+                "mode": "full",
+                "added": len(products),
+                "changed": 0,
+                "removed": 0,
+                "unchanged": 0,
+                "duration": round(time.time() - start, 3),
+                "timings": timings,
+            }
+            stats = self.last_refresh
+
+        self._notify(None)
+        return stats
+
+    def refresh(self) -> Dict[str, Any]:
+        """Incremental refresh: only re-read JSONs whose signature changed.
+
+        A product folder whose mtime is unchanged still has the same files, so
+        only its JSON is stat'ed; folders whose mtime moved are re-globbed to
+        pick up added, removed or renamed JSON files.
+        """
+        with self._refresh_lock:
+            if not self._scanned:
+                return self._full_scan()
+            return self._refresh()
+
+    def _refresh(self) -> Dict[str, Any]:
+        start = time.time()
+        timings: Dict[str, float] = {}
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+        with self._lock:
+            old_signatures = dict(self._signatures)
+
+        seen = set()
+        touched: Dict[str, Signature] = {}  # only the folder mtime moved
+        updates: Dict[str, Tuple[Signature, Optional[Dict]]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            product_folders = self._walk(pool, timings)
+
+            t = time.time()
+            checks = pool.map(lambda entry: self._check_one(entry, old_signatures.get(entry[0])),
+                              product_folders)
+            for status, folder, signature, data in checks:
+                if status == 'gone':
+                    continue  # No JSON any more: dropped below as not seen
+                seen.add(folder)
+                if status == 'touched':
+                    touched[folder] = signature
+                    status = 'unchanged'
+                elif status != 'unchanged':
+                    updates[folder] = (signature, data)
+                counts[status] += 1
+            timings["check_json"] = round(time.time() - t, 3)
+
+        changes: Dict[str, str] = {}
+        with self._lock:
+            # A write-through put() may have landed while we scanned: keep its newer data
+            written = {folder for folder, signature in self._signatures.items()
+                       if old_signatures.get(folder) != signature}
+            self._signatures.update((folder, signature) for folder, signature in touched.items()
+                                    if folder not in written)
+            for folder, (signature, data) in updates.items():
+                if folder in written:
+                    continue
+                self._signatures[folder] = signature
+                if data is not None:
+                    changes[folder] = 'changed' if folder in self._products else 'added'
+                    self._products[folder] = data
+                elif self._products.pop(folder, None) is not None:
+                    changes[folder] = 'removed'
+
+            for folder in list(self._signatures):
+                if folder not in seen and folder not in written:
+                    self._signatures.pop(folder, None)
+                    if self._products.pop(folder, None) is not None:
+                        changes[folder] = 'removed'
+                        counts["removed"] += 1
+
+            self._rebuild_name_index()
+            self.timestamp = time.time()
+            self.last_refresh = {
+                "mode": "incremental",
+                **counts,
+                "duration": round(time.time() - start, 3),
+                "timings": timings,
+            }
+            stats = self.last_refresh
+
+        if changes:
+            self._notify(changes)
+        return stats
+
+    def put(self, folder, json_path, data: Dict[str, Any]) -> str:
+        """Write-through update after the server saved a product JSON itself.
+
+        Only the saved file and its folder are stat'ed for the new signature;
+        the data that was just written is cached as-is instead of re-read.
+        Doesn't wait for a running refresh (that one keeps the newer put);
+        listeners run in the calling thread, so call it off the event loop.
+        """
+        folder, json_path = str(folder), str(json_path)
+        st = _stat(json_path)
+        folder_st = _stat(folder)
+        if st is None or folder_st is None:
+            return self._refresh_folder(folder)
+
+        product = dict(data)
+        product['_folder'] = folder
+        product['_jsonPath'] = json_path
+
+        with self._lock:
+            old = self._products.get(folder)
+            status = 'changed' if old is not None else 'added'
+            self._signatures[folder] = (folder_st.st_mtime, json_path, st.st_size, st.st_mtime)
+            self._products[folder] = product
+            if old is not None and old.get('productName') != product.get('productName'):
+                # Renamed: the old name must stop resolving here (or fall back to another product)
+                self._rebuild_name_index()
+            else:
+                self._by_name[os.path.basename(folder)] = (folder, json_path)
+                if isinstance(product.get('productName'), str):
+                    self._by_name.setdefault(product['productName'], (folder, json_path))
+        self._notify({folder: status})
+        return status
+
+    def refresh_folder(self, folder) -> str:
+        """Re-check a single product folder (used by the filesystem watcher).
+
+        Returns the resulting status: 'added', 'changed', 'removed',
+        'unchanged' or 'gone' (not a product folder).
+        """
+        folder = str(folder)
+        if os.path.basename(folder).startswith('_'):
+            return 'gone'
+        with self._refresh_lock:
+            return self._refresh_folder(folder)
+
+    def _refresh_folder(self, folder: str) -> str:
+        with self._lock:
+            old = self._signatures.get(folder)
+
+        st = _stat(folder)
+        if st is None or not os.path.isdir(folder):
+            status, signature, data = 'gone', None, None
+        else:
+            status, _, signature, data = self._check_one((folder, st.st_mtime), old)
+
+        with self._lock:
+            if self._signatures.get(folder) != old:
+                return 'unchanged'  # Superseded by a put() while we read the folder
+            if status == 'gone':
+                self._signatures.pop(folder, None)
+                if self._products.pop(folder, None) is None:
+                    return 'gone'
+                status = 'removed'
+            elif status in ('unchanged', 'touched'):
+                self._signatures[folder] = signature
+                return 'unchanged'
+            else:
+                self._signatures[folder] = signature
+                if data is not None:
+                    self._products[folder] = data
+                elif self._products.pop(folder, None) is not None:
+                    status = 'removed'
+                else:
+                    return 'unchanged'
+            self._rebuild_name_index()
+
+        self._notify({folder: status})
+        return status
+
+    # === PERSISTENT SNAPSHOT ===
+
+    def save_snapshot(self, path: Path) -> bool:
+        """Write products and signatures to a local gzip snapshot (atomic replace)"""
+        with self._lock:
+            if not self._scanned:
+                return False
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "toolsPath": str(self.tools_path),
+                "savedAt": time.time(),
+                "products": dict(self._products),
+                "signatures": dict(self._signatures),
+            }
+
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=5) as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"Warning: Failed to save catalog snapshot: {e}")
+            return False
+
+    def load_snapshot(self, path: Path) -> Optional[float]:
+        """Load a snapshot written by save_snapshot.
+
+        Returns the time it was saved, or None if it is missing, unreadable or
+        belongs to another TOOLS_PATH. The loaded signatures make the next
+        refresh() incremental, so it revalidates the snapshot cheaply.
+        """
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except Exception as e:
+            print(f"Warning: Failed to read catalog snapshot: {e}")
+            return None
+
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("toolsPath") != str(self.tools_path):
+            return None
+
+        with self._refresh_lock:
+            with self._lock:
+                self._products = snapshot["products"]
+                self._signatures = {folder: tuple(sig) for folder, sig in snapshot["signatures"].items()}
+                self._scanned = True
+                self._rebuild_name_index()
+                self.timestamp = snapshot["savedAt"]
+            self._notify(None)
+        return snapshot["savedAt"]
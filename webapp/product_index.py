@@ -0,0 +1,262 @@
+"""
+Product Query Index
+In-memory inverted index over the product cache for server-side search,
+filtering, sorting and paging (/api/products/query).
+
+Text fields are tokenized and every token suffix is indexed, so a query
+token matches anywhere inside a word - the same substring semantics as the
+browser-side filterProducts(). The index is patched per product whenever
+the product cache reports a change.
+"""
+import base64
+import bisect
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+SEARCH_FIELDS = ('productName', 'sku', 'codArticol', 'description', 'tags')
+FACET_FIELDS = ('range', 'category')
+SORT_FIELDS = ('productName', 'sku', 'codArticol', 'description', 'range', 'category')
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _field_text(product: Dict[str, Any], field: str) -> str:
+    value = product.get(field)
+    if isinstance(value, list):
+        return ' '.join(str(v) for v in value if v is not None)
+    return str(value) if value is not None else ''
+
+
+def _sort_value(product: Dict[str, Any], field: str) -> str:
+    return _field_text(product, field).lower()
+
+
+class InvalidCursor(ValueError):
+    """The cursor is not one this index issued"""
+
+
+class ExpiredCursor(InvalidCursor):
+    """The cursor's product is no longer in the result (removed or edited out of the filter)"""
+
+
+def encode_cursor(key: str) -> str:
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Optional[str]:
+    try:
+        key = base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+    except Exception:
+        return None
+    return key or None
+
+
+class ProductIndex:
+    """Token and facet indexes keyed by product folder"""
+
+    def __init__(self):
+        self.generation = 0
+        self._docs: Dict[str, Dict[str, Any]] = {}           # key -> product
+        self._doc_terms: Dict[str, Set[str]] = {}            # key -> indexed terms
+        self._postings: Dict[str, Set[str]] = {}             # term -> keys
+        self._facets: Dict[str, Dict[str, Set[str]]] = {f: {} for f in FACET_FIELDS}
+        self._sorted_terms: Optional[List[str]] = None       # for prefix lookups
+        self._sorted_keys: Dict[str, List[str]] = {}         # sort field -> ordered keys
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # === MAINTENANCE ===
+
+    def rebuild(self, products: Dict[str, Dict[str, Any]]):
+        """Re-index everything (after a full scan)"""
+        with self._lock:
+            self._docs = {}
+            self._doc_terms = {}
+            self._postings = {}
+            self._facets = {f: {} for f in FACET_FIELDS}
+            for key, product in products.items():
+                self._add(key, product)
+            self._invalidate()
+
+    def update(self, key: str, product: Optional[Dict[str, Any]]):
+        """Re-index one product (None removes it)"""
+        with self._lock:
+            self._remove(key)
+            if product is not None:
+                self._add(key, product)
+            self._invalidate()
+
+    def apply_changes(self, cache, changes: Optional[Dict[str, str]]):
+        """ProductCache listener: patch only the products that changed"""
+        if changes is None:
+            self.rebuild(cache.snapshot())
+            return
+        with self._lock:
+            for key, status in changes.items():
+                self._remove(key)
+                if status != 'removed':
+                    product = cache.get(key)
+                    if product is not None:
+                        self._add(key, product)
+            self._invalidate()
+
+    def _terms(self, product: Dict[str, Any]) -> Set[str]:
+        terms = set()
+        for field in SEARCH_FIELDS:
+            for token in tokenize(_field_text(product, field)):
+                # Every suffix, so a prefix lookup finds the token anywhere in the word
+                for i in range(len(token)):
+                    terms.add(token[i:])
+        return terms
+
+    def _add(self, key: str, product: Dict[str, Any]):
+        self._docs[key] = product
+        terms = self._terms(product)
+        self._doc_terms[key] = terms
+        for term in terms:
+            self._postings.setdefault(term, set()).add(key)
+        for field in FACET_FIELDS:
+            self._facets[field].setdefault(_field_text(product, field), set()).add(key)
+
+    def _remove(self, key: str):
+        product = self._docs.pop(key, None)
+        if product is None:
+            return
+        for term in self._doc_terms.pop(key, ()):
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+        for field in FACET_FIELDS:
+            value = _field_text(product, field)
+            keys = self._facets[field].get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._facets[field][value]
+
+    def _invalidate(self):
+        self._sorted_terms = None
+        self._sorted_keys = {}
+        self.generation += 1
+
+    # === QUERYING ===
+
+    def _match_token(self, token: str) -> Set[str]:
+        """Keys with an indexed term starting with token"""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        terms = self._sorted_terms
+        matched: Set[str] = set()
+        i = bisect.bisect_left(terms, token)
+        while i < len(terms) and terms[i].startswith(token):
+            matched |= self._postings[terms[i]]
+            i += 1
+        return matched
+
+    def _ordered_keys(self, sort: Optional[str]) -> List[str]:
+        if not sort:
+            return list(self._docs)
+        if sort not in self._sorted_keys:
+            self._sorted_keys[sort] = sorted(self._docs, key=lambda k: _sort_value(self._docs[k], sort))
+        return self._sorted_keys[sort]
+
+    def ordered_keys(self, sort: Optional[str] = None, order: str = "asc") -> List[str]:
+        """Every indexed key in sort order (cache order without sort)"""
+        if sort and sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by '{sort}'")
+        with self._lock:
+            ordered = self._ordered_keys(sort)
+            return ordered[::-1] if order == "desc" else list(ordered)
+
+    def facet_values(self, field: str) -> List[str]:
+        with self._lock:
+            return sorted(v for v in self._facets.get(field, {}) if v)
+
+    def query(
+        self,
+        q: str = "",
+        filters: Optional[Dict[str, Iterable[str]]] = None,
+        sort: Optional[str] = None,
+        order: str = "asc",
+        offset: int = 0,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Search, filter, sort and page the indexed products.
+
+        Args:
+            q: Free text; every token must match (AND), anywhere in a word
+            filters: Exact-match facet filters, e.g. {"range": ["PRO"]}
+            sort: One of SORT_FIELDS (None keeps cache order)
+            order: "asc" or "desc"
+            offset: Offset pagination (ignored when cursor is given)
+            limit: Page size (0 returns every match)
+            cursor: nextCursor from a previous page
+
+        Returns:
+            Dict with the page of products, total match count and nextCursor
+
+        Raises:
+            ValueError: Unknown sort field
+            InvalidCursor: The cursor can't be decoded
+            ExpiredCursor: The cursor's product is no longer in the result
+        """
+        start = time.perf_counter()
+        if sort and sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by '{sort}'")
+
+        with self._lock:
+            candidates: Optional[Set[str]] = None
+            for token in tokenize(q or ""):
+                matched = self._match_token(token)
+                candidates = matched if candidates is None else candidates & matched
+                if not candidates:
+                    break
+
+            for field, values in (filters or {}).items():
+                values = [v for v in values if v]
+                if field not in self._facets or not values:
+                    continue
+                matched = set()
+                for value in values:
+                    matched |= self._facets[field].get(value, set())
+                candidates = matched if candidates is None else candidates & matched
+
+            ordered = self._ordered_keys(sort)
+            if order == "desc":
+                ordered = ordered[::-1]
+            if candidates is not None:
+                ordered = [k for k in ordered if k in candidates]
+
+            if cursor:
+                last_key = decode_cursor(cursor)
+                if last_key is None:
+                    raise InvalidCursor("Malformed cursor")
+                try:
+                    offset = ordered.index(last_key) + 1
+                except ValueError:
+                    raise ExpiredCursor("Cursor has expired; restart from the first page")
+            offset = max(0, offset)
+            page_keys = ordered[offset:offset + limit] if limit > 0 else ordered[offset:]
+            end = offset + len(page_keys)
+
+            return {
+                "products": [self._docs[k] for k in page_keys],
+                "count": len(page_keys),
+                "total": len(ordered),
+                "offset": offset,
+                "limit": limit,
+                "nextCursor": encode_cursor(page_keys[-1]) if page_keys and end < len(ordered) else None,
+                "generation": self.generation,
+                "tookMs": round((time.perf_counter() - start) * 1000, 3),
+            }
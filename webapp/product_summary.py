@@ -0,0 +1,100 @@
+"""
+Product Summary
+Compact per-product view for list responses: the table columns, search
+fields and the bits of holders/previews the table renders, without
+holderTransforms, packaging, metadata or the full holder/preview records.
+
+Summaries are kept next to the full cache and patched from the same change
+notifications as the search index, so serving the summary listing never
+walks the full documents. Anything else is fetched per product on demand
+(GET /api/products/{name}).
+"""
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+SUMMARY_FIELDS = ('productName', 'sku', 'codArticol', 'description', 'range', 'category', 'tags')
+HOLDER_SUMMARY_FIELDS = ('variant', 'color', 'codArticol', 'preview')
+SUMMARY_PREVIEWS = ('meshPreview',)
+
+
+def _preview_path(product: Dict[str, Any], preview: Any) -> Optional[str]:
+    """Full path of a previews entry ({fullPath} or a file name relative to the product folder)"""
+    if isinstance(preview, dict):
+        return preview.get('fullPath') or None
+    if isinstance(preview, str) and preview:
+        if '\\' in preview or '/' in preview or ':' in preview:
+            return preview
+        folder = product.get('_folder')
+        return str(Path(folder) / preview) if folder else preview
+    return None
+
+
+def summarize(product: Dict[str, Any]) -> Dict[str, Any]:
+    """The summary view of one product document"""
+    summary = {field: product[field] for field in SUMMARY_FIELDS if field in product}
+    holders = product.get('holders')
+    if isinstance(holders, list):
+        summary['holders'] = [
+            {field: holder.get(field) for field in HOLDER_SUMMARY_FIELDS if holder.get(field) is not None}
+            for holder in holders if isinstance(holder, dict)
+        ]
+    previews = product.get('previews')
+    if isinstance(previews, dict):
+        summary['previews'] = {}
+        for name in SUMMARY_PREVIEWS:
+            path = _preview_path(product, previews.get(name))
+            if path:
+                summary['previews'][name] = {"fullPath": path}
+    return summary
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a fields= parameter ("summary" is handled by the caller); None means everything"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def project(products: Iterable[Dict[str, Any]], fields: List[str]) -> List[Dict[str, Any]]:
+    """Keep only the given top-level fields of each product"""
+    return [{field: product[field] for field in fields if field in product} for product in products]
+
+
+class SummaryCache:
+    """Summaries of every cached product, in cache order"""
+
+    def __init__(self):
+        self.generation = 0
+        self._summaries: Dict[str, Dict[str, Any]] = {}  # folder -> summary
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def rebuild(self, products: Dict[str, Dict[str, Any]]):
+        summaries = {key: summarize(product) for key, product in products.items()}
+        with self._lock:
+            self._summaries = summaries
+            self.generation += 1
+
+    def apply_changes(self, cache, changes: Optional[Dict[str, str]]):
+        """ProductCache listener: re-summarize only the products that changed"""
+        if changes is None:
+            self.rebuild(cache.snapshot())
+            return
+        with self._lock:
+            for key, status in changes.items():
+                product = cache.get(key) if status != 'removed' else None
+                if product is None:
+                    self._summaries.pop(key, None)
+                else:
+                    self._summaries[key] = summarize(product)
+            self.generation += 1
+
+    def products(self, keys: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Summaries in cache order, or in the order of keys (unknown keys are skipped)"""
+        with self._lock:
+            if keys is None:
+                return list(self._summaries.values())
+            return [self._summaries[key] for key in keys if key in self._summaries]
@@ -1,31 +1,47 @@
 """
 FastAPI server for managing product database
 """
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from pathlib import Path
 import json
+import re
 import subprocess
 from datetime import datetime
 import time
-import threading
+import asyncio
 import sys
+import threading
+import uuid
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from audit_log import log_action, get_recent_logs, get_product_history
+from audit_log import (log_action, get_recent_logs, get_product_history, query_logs,
+                       get_writer_stats, get_storage_stats, shutdown_audit_log)
+from product_cache import ProductCache
+from fs_watcher import ProductWatcher
+from product_index import ProductIndex, SORT_FIELDS, InvalidCursor, ExpiredCursor
+from payload_cache import PayloadCache, Payload, dumps, payload_response, pick_encoding, stream_response
+from product_summary import SummaryCache, parse_fields, project, summarize
+from catalog_db import CatalogMirror, fts5_available
+from holder_catalog import HolderCatalog
+from thumbnails import ThumbnailService
+from asset_cache import AssetCache
+from jobs import JobScheduler, Job
+from preview_pipeline import run_pipeline as run_preview_pipeline
 
 # Import our existing tools
 autopop_product_json = None
+autopop_batch = None
 scan_database_func = None
 
 try:
-    from autopop_product_json import autopop_product_json
+    from autopop_product_json import autopop_product_json, autopop_batch
 except ImportError:
     pass
 
@@ -49,11 +65,125 @@ app.add_middleware(
 BASE_PATH = Path(r"M:\Proiectare\__SCAN 3D Produse\__BOSCH\__NEW DB__")
 TOOLS_PATH = BASE_PATH / "Tools and Holders"
 
+# Local (non-network) folder for snapshots and other caches
+LOCAL_CACHE_DIR = Path(__file__).parent / "cache"
+CATALOG_SNAPSHOT_FILE = LOCAL_CACHE_DIR / "catalog_snapshot.json.gz"
+
 # In-memory cache for products
 products_cache = {}
 products_cache_timestamp = 0
 CACHE_DURATION = 120  # Cache duration in seconds (optimized for 500+ products)
-cache_lock = threading.Lock()
+SCAN_WORKERS = 16  # Concurrent folder listings / JSON reads while scanning the share
+refresh_task: Optional[asyncio.Task] = None  # In-flight background refresh, shared by all requests
+refresh_task_full = False
+product_cache = ProductCache(TOOLS_PATH, workers=SCAN_WORKERS)  # Per-product stat signatures for incremental refresh
+
+# Filesystem watcher: "auto" (watchdog if installed, else polling), "watchdog", "poll" or "off"
+WATCHER_MODE = "auto"
+WATCHER_POLL_INTERVAL = 15  # seconds between incremental refreshes when polling
+product_watcher = ProductWatcher(product_cache, mode=WATCHER_MODE, poll_interval=WATCHER_POLL_INTERVAL)
+
+def on_products_changed(changes):
+    """Keep the /api/products snapshot in step with targeted cache updates"""
+    global products_cache
+    products = product_cache.products
+    products_cache = {"products": products, "count": len(products)}
+
+product_cache.add_listener(on_products_changed)
+
+# Inverted index for /api/products/query, patched on every cache change
+product_index = ProductIndex()
+product_cache.add_listener(lambda changes: product_index.apply_changes(product_cache, changes))
+
+# Compact summary view of every product (fields=summary), patched on every cache change
+summary_cache = SummaryCache()
+product_cache.add_listener(lambda changes: summary_cache.apply_changes(product_cache, changes))
+
+# Serialized + compressed /api/products bodies, one per cache generation
+payload_cache = PayloadCache()
+
+# Optional local SQLite mirror (products, holders, previews, tags + FTS5 search)
+CATALOG_DB_ENABLED = True
+CATALOG_DB_FILE = LOCAL_CACHE_DIR / "catalog.sqlite3"
+catalog_db = None
+if CATALOG_DB_ENABLED:
+    if fts5_available():
+        try:
+            catalog_db = CatalogMirror(CATALOG_DB_FILE)
+            product_cache.add_listener(lambda changes: catalog_db.apply_changes(product_cache, changes))
+        except Exception as e:
+            print(f"Warning: Catalog database disabled: {e}")
+    else:
+        print("Warning: Catalog database disabled: SQLite was built without FTS5")
+
+# Holder files/previews index shared by /api/holders and auto-populate (revalidated by mtime)
+holder_catalog = HolderCatalog(TOOLS_PATH)
+
+# Resized preview variants in a local disk cache (?size= on the preview endpoints)
+THUMBNAIL_CACHE_DIR = LOCAL_CACHE_DIR / "thumbnails"
+THUMBNAIL_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # pruned at startup and as new thumbnails/atlases are written
+THUMBNAIL_MAX_AGE = 86400  # browser cache lifetime (seconds) for thumbnails
+THUMBNAIL_PREGENERATE_SIZES = (256,)  # generated in the background for new/changed products
+thumbnails = ThumbnailService(THUMBNAIL_CACHE_DIR, max_bytes=THUMBNAIL_CACHE_MAX_BYTES)
+
+# Local read-through copy of images/assets served from the share (LRU, validated by size + mtime)
+ASSET_CACHE_DIR = LOCAL_CACHE_DIR / "assets"
+ASSET_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+asset_cache = AssetCache(ASSET_CACHE_DIR, max_bytes=ASSET_CACHE_MAX_BYTES)
+
+def product_preview_sources(product: Dict[str, Any]) -> List[Path]:
+    """Preview images of a product as served by /api/preview and /api/holder-preview"""
+    sources = []
+    folder = Path(product.get('_folder') or '')
+    previews = product.get('previews') or {}
+    for kind in ('meshPreview', 'graficaPreview'):
+        preview = previews.get(kind) if isinstance(previews, dict) else None
+        if isinstance(preview, dict) and preview.get('fullPath'):
+            sources.append(folder / preview['fullPath'].replace('\\', '/').split('/')[-1])
+    for holder in product.get('holders') or []:
+        if isinstance(holder, dict) and holder.get('preview'):
+            found = holder_catalog.find_preview(holder['preview'].replace('\\', '/').split('/')[-1])
+            if found:
+                sources.append(found)
+    return sources
+
+def pregenerate_thumbnails(changes):
+    """Product cache listener: queue list-size thumbnails for added/changed products"""
+    if not thumbnails.available:
+        return
+    if changes is None:
+        folders = list(product_cache.snapshot())
+    else:
+        folders = [folder for folder, status in changes.items() if status in ('added', 'changed')]
+    
+    def collect():
+        sources = []
+        for folder in folders:
+            product = product_cache.get(folder)
+            if product:
+                sources.extend(product_preview_sources(product))
+        thumbnails.pregenerate(sources, THUMBNAIL_PREGENERATE_SIZES)
+    
+    # Resolving holder previews may touch the share: keep it off the refresh path
+    threading.Thread(target=collect, name="thumbnail-collect", daemon=True).start()
+
+product_cache.add_listener(pregenerate_thumbnails)
+
+# Streaming listing: products per chunk (the first chunk is one table page)
+STREAM_FIRST_CHUNK = 50
+STREAM_CHUNK = 500
+
+# Background jobs (scan, preview extraction, batch auto-populate); job state survives restarts
+JOB_WORKERS = 2
+JOBS_STATE_FILE = LOCAL_CACHE_DIR / "jobs.json"
+job_scheduler = JobScheduler(JOBS_STATE_FILE, workers=JOB_WORKERS)
+
+# Batch auto-populate: products processed in parallel, cancel events by batch id
+AUTOPOP_WORKERS = 8
+autopop_batches: Dict[str, threading.Event] = {}
+
+# Preview extraction: worker threads for read/convert (None = preview_pipeline.DEFAULT_WORKERS)
+PREVIEW_WORKERS = None
 
 # Pydantic models
 class ProductBase(BaseModel):
@@ -74,6 +204,24 @@ class HolderInfo(BaseModel):
     fullPath: Optional[str] = None
     preview: Optional[str] = None
 
+class AutoPopulateBatch(BaseModel):
+    products: Optional[List[str]] = None  # None = every product in the catalog
+    force: bool = False
+    workers: Optional[int] = None
+
+class AtlasItem(BaseModel):
+    id: str
+    range: Optional[str] = None      # product preview: range/category/product/file
+    category: Optional[str] = None
+    product: Optional[str] = None
+    file: str                        # holder preview: just the file name
+    holder: bool = False
+
+class AtlasRequest(BaseModel):
+    items: List[AtlasItem]
+    size: int = 256
+    format: str = "auto"
+
 class ProductComplete(ProductBase):
     holders: List[HolderInfo] = []
     holderTransforms: Optional[Dict[str, Any]] = None  # Use Any to avoid validation issues
@@ -82,6 +230,36 @@ class ProductComplete(ProductBase):
     packaging: dict = {}
     metadata: dict = {}
 
+@app.on_event("startup")
+async def on_startup():
+    global products_cache_timestamp
+    
+    # Serve the last snapshot immediately; it is revalidated incrementally below
+    loop = asyncio.get_running_loop()
+    saved_at = await loop.run_in_executor(None, product_cache.load_snapshot, CATALOG_SNAPSHOT_FILE)
+    if saved_at:
+        products_cache_timestamp = saved_at
+        print(f"📦 Loaded catalog snapshot ({len(product_cache)} products, "
+              f"age: {time.time() - saved_at:.0f}s)")
+    
+    # The watcher thread's whole-tree refreshes run on this loop like any other refresh
+    product_watcher.refresh = lambda: asyncio.run_coroutine_threadsafe(watcher_refresh(), loop).result()
+    product_watcher.start()
+    job_scheduler.load()
+    thumbnails.start_prune()
+    # Warm/revalidate the product cache without holding up startup
+    await start_refresh()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Off the loop: the watcher thread may be waiting on a refresh that runs on it
+    await asyncio.get_running_loop().run_in_executor(None, product_watcher.stop)
+    product_cache.save_snapshot(CATALOG_SNAPSHOT_FILE)
+    job_scheduler.shutdown()
+    thumbnails.shutdown()
+    # Write out any queued audit entries before exiting
+    shutdown_audit_log()
+
 # API Routes
 @app.get("/")
 async def root():
@@ -89,66 +267,243 @@ async def root():
     return FileResponse(Path(__file__).parent / "static" / "index.html")
 
 def scan_products():
-    """Scan filesystem for products - called by cache refresh"""
-    products = []
+    """Scan filesystem for products - full rescan of every product JSON"""
+    product_cache.full_scan()
+    return product_cache.products
+
+def refresh_products(full: bool = False):
+    """Refresh the product cache - incremental unless a full rescan is requested"""
+    stats = product_cache.full_scan() if full else product_cache.refresh()
+    return product_cache.products, stats
+
+async def _run_refresh(full: bool, quiet: bool = False):
+    """Refresh the cache in a worker thread so the event loop keeps serving (quiet: log only changes)"""
+    global products_cache, products_cache_timestamp
     
-    if not TOOLS_PATH.exists():
-        return products
+    age = time.time() - products_cache_timestamp
+    if not quiet:
+        print(f"🔄 Refreshing product cache in background... (age: {age:.1f}s)")
+    start = time.time()
+    try:
+        loop = asyncio.get_running_loop()
+        products, stats = await loop.run_in_executor(None, refresh_products, full)
+    except Exception as e:
+        print(f"❌ Cache refresh failed, keeping last snapshot: {e}")
+        return
     
-    # Scan for all JSON files
-    for range_folder in TOOLS_PATH.iterdir():
-        if not range_folder.is_dir() or range_folder.name.startswith('_'):
-            continue
-        
-        for category_folder in range_folder.iterdir():
-            if not category_folder.is_dir() or category_folder.name.startswith('_'):
-                continue
-            
-            for product_folder in category_folder.iterdir():
-                if not product_folder.is_dir() or product_folder.name.startswith('_'):
-                    continue
-                
-                # Find JSON file
-                json_files = list(product_folder.glob("*.json"))
-                if json_files:
-                    try:
-                        with open(json_files[0], 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            data['_folder'] = str(product_folder)
-                            data['_jsonPath'] = str(json_files[0])
-                            products.append(data)
-                    except Exception as e:
-                        print(f"Error reading {json_files[0]}: {e}")
+    products_cache = {"products": products, "count": len(products)}
+    products_cache_timestamp = time.time()
+    await loop.run_in_executor(None, product_cache.save_snapshot, CATALOG_SNAPSHOT_FILE)
+    if quiet and not (stats['added'] or stats['changed'] or stats['removed']):
+        return
+    print(f"✅ Cache refreshed in {time.time() - start:.2f}s ({len(products)} products, "
+          f"{stats['mode']}: +{stats['added']} ~{stats['changed']} -{stats['removed']})")
+    print(f"   Phase timings: {stats['timings']}")
+
+async def start_refresh(full: bool = False, quiet: bool = False) -> asyncio.Task:
+    """Start a background refresh, or join the one already running"""
+    global refresh_task, refresh_task_full
+    
+    if refresh_task and not refresh_task.done():
+        if not full or refresh_task_full:
+            return refresh_task
+        # A full rescan was asked for while an incremental one runs: queue it after
+        await asyncio.shield(refresh_task)
+        if refresh_task and not refresh_task.done():
+            return refresh_task
     
-    return products
+    refresh_task = asyncio.create_task(_run_refresh(full, quiet))
+    refresh_task_full = full
+    return refresh_task
+
+async def watcher_refresh():
+    """Poll/structure-change refresh from the watcher thread, through the same path as requests"""
+    await asyncio.shield(await start_refresh(quiet=True))
+
+async def load_products(force_refresh: bool = False, full: bool = False):
+    """Return the product listing snapshot (stale-while-revalidate).
+    
+    An expired snapshot is still served while a single background refresh
+    revalidates it; callers only wait when there is no snapshot yet, the
+    cache was explicitly invalidated, or a refresh was requested.
+    """
+    cache_age = time.time() - products_cache_timestamp
+    
+    if force_refresh or full or not products_cache or products_cache_timestamp == 0:
+        await asyncio.shield(await start_refresh(full))
+        if not products_cache:
+            raise HTTPException(status_code=503, detail="Product scan failed")
+    elif cache_age > CACHE_DURATION:
+        await start_refresh()
+        print(f"📦 Serving stale snapshot (age: {cache_age:.1f}s) while refreshing")
+    
+    return products_cache
+
+def snapshot_headers() -> Dict[str, str]:
+    """Snapshot age and generation, sent with every listing response"""
+    return {
+        "X-Snapshot-Age": f"{time.time() - products_cache_timestamp:.1f}",
+        "X-Snapshot-Generation": str(product_cache.generation),
+    }
+
+def represent_products(products: List[Dict[str, Any]], fields: Optional[str]) -> List[Dict[str, Any]]:
+    """Products in the requested representation: full, "summary" or a field projection"""
+    if fields == "summary":
+        return [summarize(product) for product in products]
+    field_list = parse_fields(fields)
+    return products if field_list is None else project(products, field_list)
+
+def listing_products(fields: Optional[str]) -> List[Dict[str, Any]]:
+    """The whole listing in cache order (summaries come precomputed)"""
+    if fields == "summary":
+        return summary_cache.products()
+    return represent_products(products_cache["products"], fields)
 
 @app.get("/api/products")
-async def list_products(force_refresh: bool = False):
-    """Get all products from database (cached)"""
-    global products_cache, products_cache_timestamp
+async def list_products(request: Request, force_refresh: bool = False, full: bool = False,
+                        fields: Optional[str] = None):
+    """Get all products from database (cached, pre-serialized, ETag-validated).
+
+    fields=summary returns the precomputed compact view; fields=a,b,c keeps
+    only those top-level fields. Full documents: GET /api/products/{name}.
+    """
+    await load_products(force_refresh=force_refresh, full=full)
+    generation = product_cache.generation
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""))
     
-    current_time = time.time()
+    def build() -> Payload:
+        # Serializing/compressing the whole catalog takes a while: never on the loop
+        if fields is None:
+            payload = payload_cache.get("products", generation, lambda: products_cache)
+        elif fields == "summary":
+            payload = payload_cache.get("products:summary", generation,
+                                        lambda: {"products": summary_cache.products(), "count": len(summary_cache)})
+        else:
+            products = listing_products(fields)
+            payload = Payload(generation, dumps({"products": products, "count": len(products)}))
+        if encoding and not payload.matches(request.headers.get("if-none-match")):
+            payload.encoded(encoding)
+        return payload
     
-    # Check if cache is valid
-    with cache_lock:
-        cache_age = current_time - products_cache_timestamp
-        
-        if force_refresh or cache_age > CACHE_DURATION or not products_cache:
-            print(f"🔄 Refreshing product cache... (age: {cache_age:.1f}s)")
-            start = time.time()
-            products = scan_products()
-            products_cache = {"products": products, "count": len(products)}
-            products_cache_timestamp = current_time
-            print(f"✅ Cache refreshed in {time.time() - start:.2f}s ({len(products)} products)")
+    payload = await asyncio.get_running_loop().run_in_executor(None, build)
+    return payload_response(request, payload, headers=snapshot_headers())
+
+@app.get("/api/products/stream")
+async def stream_products(request: Request, force_refresh: bool = False, sort: Optional[str] = None,
+                          order: str = "asc", fields: Optional[str] = None):
+    """Product listing as NDJSON, one product per line, for progressive rendering.
+
+    Lines: {"type": "start", "count", "generation"}, one {"type": "product",
+    "product": {...}} per product (sorted by `sort` if given), then
+    {"type": "done", "count"}. The first lines are flushed as one small chunk
+    so the client can paint the first page before the rest arrives. fields
+    works as for /api/products. Compressed per chunk (br/gzip) and
+    ETag-validated by cache generation like the plain listing.
+    """
+    if sort and sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort}'. Use one of: {', '.join(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    
+    await load_products(force_refresh=force_refresh)
+    generation = product_cache.generation
+    
+    def lines():
+        # Sync generator: Starlette iterates it in a worker thread, so building and
+        # encoding stay off the loop (and are skipped entirely on a 304)
+        if sort and fields == "summary":
+            products = summary_cache.products(product_index.ordered_keys(sort, order))
+        elif sort:
+            products = represent_products(product_index.query(sort=sort, order=order, limit=0)["products"], fields)
         else:
-            print(f"📦 Using cached data (age: {cache_age:.1f}s)")
+            products = listing_products(fields)
+            if order == "desc":
+                products = products[::-1]
+        yield json.dumps({"type": "start", "count": len(products), "generation": generation}) + "\n"
+        chunk_size = STREAM_FIRST_CHUNK
+        start = 0
+        while start < len(products):
+            batch = products[start:start + chunk_size]
+            yield "".join(json.dumps({"type": "product", "product": product}, ensure_ascii=False) + "\n"
+                          for product in batch)
+            start += chunk_size
+            chunk_size = STREAM_CHUNK
+        yield json.dumps({"type": "done", "count": len(products)}) + "\n"
     
-    return products_cache
+    key = f"stream:{sort or ''}:{order}:{fields or ''}"
+    return stream_response(request, key, generation, lines, "application/x-ndjson", headers=snapshot_headers())
 
-@app.get("/api/products/{product_name}")
-async def get_product(product_name: str):
-    """Get a specific product by name"""
-    # Search for product
+@app.get("/api/cache/status")
+async def cache_status():
+    """Snapshot age, generation and refresh state of the product cache"""
+    return {
+        "generation": product_cache.generation,
+        "age": round(time.time() - products_cache_timestamp, 1) if products_cache_timestamp else None,
+        "count": products_cache.get("count", 0),
+        "refreshing": bool(refresh_task and not refresh_task.done()),
+        "lastRefresh": product_cache.last_refresh,
+        "watcher": product_watcher.mode,
+        "catalogDb": catalog_db.stats() if catalog_db else None,
+        "holderCatalog": holder_catalog.stats(),
+        "thumbnails": thumbnails.stats(),
+        "assets": asset_cache.stats(),
+        "jobs": job_scheduler.stats()
+    }
+
+@app.get("/api/products/query")
+async def query_products(
+    q: str = "",
+    range_: List[str] = Query([], alias="range"),
+    category: List[str] = Query([]),
+    sort: Optional[str] = None,
+    order: str = "asc",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=0, le=10000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Search, filter, sort and page products server-side (in-memory index); fields as for /api/products.
+
+    A malformed cursor is a 400; a cursor whose product has since left the
+    result is a 410 (restart from the first page).
+    """
+    if sort and sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sort}'. Use one of: {', '.join(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    
+    # Same freshness rules as the plain listing
+    await load_products()
+    
+    try:
+        result = product_index.query(
+            q=q,
+            filters={"range": range_, "category": category},
+            sort=sort,
+            order=order,
+            offset=offset,
+            limit=limit,
+            cursor=cursor
+        )
+    except ExpiredCursor as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result["products"] = represent_products(result["products"], fields)
+    result["facets"] = {"range": product_index.facet_values("range"),
+                        "category": product_index.facet_values("category")}
+    return result
+
+def find_product_folder(product_name: str):
+    """Resolve a product name to (folder, JSON path) - O(1) index hit, tree walk on a miss"""
+    entry = product_cache.lookup(product_name)
+    if entry:
+        product_folder, json_path = Path(entry[0]), Path(entry[1])
+        if json_path.exists():
+            return product_folder, json_path
+        product_cache.forget(product_name)
+    
+    # Index miss (new or moved folder): walk the category folders
     for range_folder in TOOLS_PATH.iterdir():
         if not range_folder.is_dir() or range_folder.name.startswith('_'):
             continue
@@ -157,17 +512,43 @@ async def get_product(product_name: str):
             if not category_folder.is_dir() or category_folder.name.startswith('_'):
                 continue
             
-            for product_folder in category_folder.iterdir():
-                if product_folder.name == product_name and product_folder.is_dir():
-                    json_files = list(product_folder.glob("*.json"))
-                    if json_files:
-                        with open(json_files[0], 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            data['_folder'] = str(product_folder)
-                            data['_jsonPath'] = str(json_files[0])
-                            return data
-    
-    raise HTTPException(status_code=404, detail="Product not found")
+            product_folder = category_folder / product_name
+            if product_folder.is_dir():
+                json_files = list(product_folder.glob("*.json"))
+                if json_files:
+                    product_cache.remember(product_name, product_folder, json_files[0])
+                    return product_folder, json_files[0]
+    
+    return None
+
+@app.get("/api/search")
+async def search_products(q: str, limit: int = Query(50, ge=1, le=500)):
+    """Full-text product search served from the SQLite mirror (FTS5)"""
+    if not catalog_db:
+        raise HTTPException(status_code=501, detail="Catalog database not available")
+    
+    await load_products()
+    products = catalog_db.search(q, limit=limit)
+    return {"products": products, "count": len(products), "query": q}
+
+@app.get("/api/products/{product_name}")
+async def get_product(product_name: str, fresh: bool = False):
+    """Get a specific product by name (from the catalog mirror unless fresh=true)"""
+    if catalog_db and not fresh:
+        data = catalog_db.get_product(product_name)
+        if data:
+            return data
+    
+    found = find_product_folder(product_name)
+    if not found:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    product_folder, json_path = found
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        data['_folder'] = str(product_folder)
+        data['_jsonPath'] = str(json_path)
+        return data
 
 class NewProductRequest(BaseModel):
     folderPath: str
@@ -285,6 +666,8 @@ async def create_product(request: NewProductRequest):
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(minimal_json, f, indent=2, ensure_ascii=False)
         
+        await asyncio.get_running_loop().run_in_executor(None, product_cache.put, folder_path, json_path, minimal_json)
+        
         return {
             "success": True,
             "productName": product_name,
@@ -305,148 +688,299 @@ async def auto_populate_product(product_name: str, request: Request):
     user_agent = request.headers.get("user-agent", "unknown")
     
     # Find product folder
-    for range_folder in TOOLS_PATH.iterdir():
-        if not range_folder.is_dir() or range_folder.name.startswith('_'):
-            continue
+    found = find_product_folder(product_name)
+    if not found:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    product_folder, json_path = found
+    
+    # Run auto-population - pass FOLDER not JSON file (off the event loop, it reads the share)
+    loop = asyncio.get_running_loop()
+    success = await loop.run_in_executor(
+        None, lambda: autopop_product_json(product_folder, catalog=holder_catalog))
+    if success:
+        # Log the action
+        log_action("auto_populate", product_name, client_ip, user_agent, 
+                 {"status": "success", "file": str(json_path)})
         
-        for category_folder in range_folder.iterdir():
-            if not category_folder.is_dir() or category_folder.name.startswith('_'):
-                continue
-            
-            for product_folder in category_folder.iterdir():
-                if product_folder.name == product_name and product_folder.is_dir():
-                    json_files = list(product_folder.glob("*.json"))
-                    if json_files:
-                        # Run auto-population - pass FOLDER not JSON file
-                        success = autopop_product_json(product_folder)
-                        if success:
-                            # Log the action
-                            log_action("auto_populate", product_name, client_ip, user_agent, 
-                                     {"status": "success", "file": str(json_files[0])})
-                            
-                            # Return updated data
-                            with open(json_files[0], 'r', encoding='utf-8') as f:
-                                return json.load(f)
-                        else:
-                            log_action("auto_populate", product_name, client_ip, user_agent, 
-                                     {"status": "failed"})
-                            raise HTTPException(status_code=500, detail="Auto-population failed")
-    
-    raise HTTPException(status_code=404, detail="Product not found")
+        # Return updated data (and patch it into the cache)
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        await asyncio.get_running_loop().run_in_executor(None, product_cache.put, product_folder, json_path, data)
+        return data
+    else:
+        log_action("auto_populate", product_name, client_ip, user_agent, 
+                 {"status": "failed"})
+        raise HTTPException(status_code=500, detail="Auto-population failed")
+
+@app.post("/api/products/auto-populate")
+async def auto_populate_batch(batch: AutoPopulateBatch, request: Request):
+    """Auto-populate a selection (or all) products, streaming NDJSON progress.
+
+    Lines: {"type": "start", "batchId", "total"}, one {"type": "result", ...}
+    per product as it finishes, then {"type": "done", ...}. Cancel with
+    POST /api/products/auto-populate/{batchId}/cancel or by disconnecting.
+    """
+    if not autopop_batch:
+        raise HTTPException(status_code=501, detail="Auto-population module not available")
+    
+    client_ip = request.client.host if request.client else "unknown"
+    user_agent = request.headers.get("user-agent", "unknown")
+    
+    await load_products()
+    if batch.products is None:
+        folders = [Path(folder) for folder in product_cache.snapshot()]
+        missing = []
+    else:
+        folders, missing = [], []
+        for name in batch.products:
+            found = find_product_folder(name)
+            if found:
+                folders.append(found[0])
+            else:
+                missing.append(name)
+    
+    batch_id = uuid.uuid4().hex[:12]
+    cancel_event = threading.Event()
+    autopop_batches[batch_id] = cancel_event
+    workers = max(1, min(batch.workers or AUTOPOP_WORKERS, 32))
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+    
+    def run_batch():
+        try:
+            for result in autopop_batch(folders, force=batch.force, workers=workers,
+                                        cancel_event=cancel_event, catalog=holder_catalog):
+                if result.get("success"):
+                    # Write-through so listings reflect the new JSON immediately
+                    product_cache.refresh_folder(Path(result["folder"]))
+                log_action("auto_populate", result.get("productName"), client_ip, user_agent,
+                           {"status": "success" if result.get("success") else "failed",
+                            "batch": batch_id, "error": result.get("error")})
+                loop.call_soon_threadsafe(results.put_nowait, result)
+        finally:
+            loop.call_soon_threadsafe(results.put_nowait, None)
+    
+    async def stream():
+        start = time.perf_counter()
+        done = succeeded = 0
+        yield json.dumps({"type": "start", "batchId": batch_id, "total": len(folders),
+                          "missing": missing, "workers": workers}) + "\n"
+        worker = loop.run_in_executor(None, run_batch)
+        try:
+            while True:
+                try:
+                    result = await asyncio.wait_for(results.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        cancel_event.set()
+                    continue
+                if result is None:
+                    break
+                done += 1
+                succeeded += 1 if result.get("success") else 0
+                yield json.dumps({"type": "result", "done": done, "total": len(folders), **result},
+                                 ensure_ascii=False) + "\n"
+            await worker
+            summary = {"total": len(folders), "processed": done, "succeeded": succeeded,
+                       "failed": done - succeeded, "cancelled": cancel_event.is_set(),
+                       "elapsedMs": round((time.perf_counter() - start) * 1000)}
+            log_action("auto_populate_batch", None, client_ip, user_agent, {"batch": batch_id, **summary})
+            yield json.dumps({"type": "done", "batchId": batch_id, **summary}) + "\n"
+        finally:
+            # Client went away mid-stream: stop scheduling new products
+            cancel_event.set()
+            autopop_batches.pop(batch_id, None)
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Batch-Id": batch_id})
+
+@app.post("/api/products/auto-populate/{batch_id}/cancel")
+async def cancel_auto_populate_batch(batch_id: str):
+    """Stop a running batch after the products already in progress"""
+    cancel_event = autopop_batches.get(batch_id)
+    if not cancel_event:
+        raise HTTPException(status_code=404, detail="Batch not found or already finished")
+    cancel_event.set()
+    return {"success": True, "batchId": batch_id}
 
 @app.put("/api/products/{product_name}")
 async def update_product(product_name: str, product: ProductComplete):
     """Update a product JSON"""
     # Find product folder
-    for range_folder in TOOLS_PATH.iterdir():
-        if not range_folder.is_dir() or range_folder.name.startswith('_'):
-            continue
-        
-        for category_folder in range_folder.iterdir():
-            if not category_folder.is_dir() or category_folder.name.startswith('_'):
-                continue
-            
-            for product_folder in category_folder.iterdir():
-                if product_folder.name == product_name and product_folder.is_dir():
-                    json_files = list(product_folder.glob("*.json"))
-                    if json_files:
-                        # Save updated JSON - include all fields, even None values
-                        product_dict = product.dict(exclude_none=False, exclude_unset=False)
-                        with open(json_files[0], 'w', encoding='utf-8') as f:
-                            json.dump(product_dict, f, indent=2, ensure_ascii=False)
-                        
-                        # Invalidate cache
-                        global products_cache_timestamp
-                        products_cache_timestamp = 0
-                        print("🔄 Cache invalidated after product update")
-                        
-                        return {"success": True, "message": "Product updated"}
-    
-    raise HTTPException(status_code=404, detail="Product not found")
+    found = find_product_folder(product_name)
+    if not found:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    product_folder, json_path = found
+    
+    # Save updated JSON - include all fields, even None values
+    product_dict = product.dict(exclude_none=False, exclude_unset=False)
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(product_dict, f, indent=2, ensure_ascii=False)
+    
+    # Write-through: patch this product into the cache and derived indexes
+    await asyncio.get_running_loop().run_in_executor(None, product_cache.put, product_folder, json_path, product_dict)
+    
+    # Keep the name index pointing at this folder if the product was renamed
+    if product.productName != product_name:
+        product_cache.remember(product.productName, product_folder, json_path)
+    
+    return {"success": True, "message": "Product updated"}
 
 @app.post("/api/cache/refresh")
-async def refresh_cache():
-    """Force refresh the product cache"""
+async def refresh_cache(full: bool = False):
+    """Force refresh the product cache (incremental unless full=true)"""
     global products_cache_timestamp
     products_cache_timestamp = 0
     print("🔄 Cache invalidated by user request")
-    # Trigger a refresh by calling list_products
-    result = await list_products(force_refresh=True)
-    return {"success": True, "message": f"Cache refreshed with {result['count']} products"}
+    # Trigger a refresh through the shared loader
+    result = await load_products(force_refresh=True, full=full)
+    return {
+        "success": True,
+        "message": f"Cache refreshed with {result['count']} products",
+        "refresh": product_cache.last_refresh
+    }
 
 @app.get("/api/holders")
-async def list_holders():
-    """Get all available holders"""
-    holders_path = TOOLS_PATH / "Holders"
-    holders = []
-    
-    if holders_path.exists():
-        for file in holders_path.glob("*.3dm"):
-            holders.append({
-                "fileName": file.name,
-            })
+async def list_holders(category: Optional[str] = None):
+    """Get all available holders (root and per-category), optionally for one category"""
+    loop = asyncio.get_running_loop()
+    holders = await loop.run_in_executor(None, holder_catalog.holders, category)
+    return {"holders": holders, "count": len(holders)}
+
+@app.get("/api/holders/usage")
+async def holder_usage(variant: str = "", color: str = "", codArticol: str = "", fileName: str = ""):
+    """Products that use a given holder (by variant/color/codArticol/fileName)"""
+    if not catalog_db:
+        raise HTTPException(status_code=501, detail="Catalog database not available")
+    if not (variant or color or codArticol or fileName):
+        raise HTTPException(status_code=400, detail="Give at least one of variant, color, codArticol, fileName")
     
-    return {"holders": holders}
+    await load_products()
+    products = catalog_db.holder_usage(variant=variant, color=color, cod_articol=codArticol, file_name=fileName)
+    return {"products": products, "count": len(products)}
 
 @app.post("/api/scan")
 async def scan_database(request: Request):
-    """Trigger database scan"""
+    """Trigger database scan (runs as a background job; poll /api/jobs/{jobId})"""
     if not scan_database_func:
         raise HTTPException(status_code=501, detail="Scanner not available")
     
-    # Get client IP
-    client_ip = request.client.host if request.client else "unknown"
-    user_agent = request.headers.get("user-agent", "unknown")
-    
+    return submit_job_response("scan", {}, request)
+
+async def asset_response(source: Path, detail: str = "File not found"):
+    """Serve a file from the share through the local asset cache"""
+    loop = asyncio.get_running_loop()
     try:
-        scan_database_func()
-        
-        # Log the action
-        log_action("scan_database", None, client_ip, user_agent, {"status": "success"})
-        
-        return {"success": True, "message": "Database scanned successfully"}
+        local = await loop.run_in_executor(None, asset_cache.get, source)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=detail)
+    return FileResponse(local)
+
+async def thumbnail_response(request: Request, source: Path, size: int, format: str):
+    """Serve a cached resized variant of source (ETag + long-lived Cache-Control)"""
+    fmt = thumbnails.pick_format(format, request.headers.get("accept", ""))
+    loop = asyncio.get_running_loop()
+    try:
+        path, media_type, etag = await loop.run_in_executor(None, thumbnails.get, source, size, fmt)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Preview not found")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"Warning: thumbnail failed for {source}: {e}")
+        return await asset_response(source)  # Not an image Pillow can read: serve the original
+    
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"public, max-age={THUMBNAIL_MAX_AGE}",
+        "Vary": "Accept",
+    }
+    if f'"{etag}"' in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
 
 @app.get("/api/preview/{range_name}/{category}/{product_name}/{filename}")
-async def get_preview(range_name: str, category: str, product_name: str, filename: str):
-    """Serve preview images"""
+async def get_preview(range_name: str, category: str, product_name: str, filename: str, request: Request,
+                      size: Optional[int] = Query(None, ge=1), format: str = "auto"):
+    """Serve preview images (a cached thumbnail when ?size= is given)"""
     file_path = TOOLS_PATH / range_name / category / product_name / filename
     
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Preview not found")
     
-    return FileResponse(file_path)
+    if size and thumbnails.available:
+        return await thumbnail_response(request, file_path, size, format)
+    return await asset_response(file_path, "Preview not found")
 
-@app.get("/api/holder-preview/{filename}")
-async def get_holder_preview(filename: str):
-    """Serve holder preview images from Holders folder"""
-    # Search in Holders folder structure - look in category/Previews subfolders
-    holders_path = TOOLS_PATH / "Holders"
-    
-    # First try in category-specific Previews folders (e.g., Holders/Garden/Previews/)
-    for category_folder in holders_path.iterdir():
-        if category_folder.is_dir() and not category_folder.name.startswith('_'):
-            # Try "Previews" folder
-            previews_folder = category_folder / "Previews"
-            if previews_folder.exists():
-                preview_file = previews_folder / filename
-                if preview_file.exists() and preview_file.is_file():
-                    return FileResponse(preview_file)
-            
-            # Try "previews" folder (lowercase)
-            previews_folder = category_folder / "previews"
-            if previews_folder.exists():
-                preview_file = previews_folder / filename
-                if preview_file.exists() and preview_file.is_file():
-                    return FileResponse(preview_file)
+@app.post("/api/thumbnails/atlas")
+async def build_thumbnail_atlas(atlas: AtlasRequest, request: Request):
+    """Many preview thumbnails as one sprite image plus a coordinate map.
+
+    Returns the atlas URL and {id: {x, y, w, h}} in atlas pixels; ids whose
+    image is missing are listed under "missing".
+    """
+    if not thumbnails.available:
+        raise HTTPException(status_code=501, detail="Thumbnails not available (Pillow not installed)")
+    
+    def resolve(item: AtlasItem, tools_root: Path) -> Optional[Path]:
+        if item.holder:
+            return holder_catalog.find_preview(item.file)
+        if not (item.range and item.category and item.product):
+            return None
+        source = (TOOLS_PATH / item.range / item.category / item.product / item.file).resolve()
+        try:
+            source.relative_to(tools_root)
+        except ValueError:
+            return None  # ".." or an absolute part: outside the tools tree
+        return source if source.exists() else None
+    
+    fmt = thumbnails.pick_format(atlas.format, request.headers.get("accept", ""))
     
-    # Fallback: search recursively for the file anywhere
-    for file in holders_path.rglob(filename):
-        if file.is_file():
-            return FileResponse(file)
+    def build():
+        tools_root = TOOLS_PATH.resolve()
+        sources = [resolve(item, tools_root) for item in atlas.items]
+        return thumbnails.build_atlas(sources, atlas.size, fmt)
     
-    raise HTTPException(status_code=404, detail="Holder preview not found")
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(None, build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    cells = {item.id: cell for item, cell in zip(atlas.items, result["cells"]) if cell}
+    return {
+        "url": f"/api/thumbnails/atlas/{result['name']}" if result["name"] else None,
+        "size": result["size"],
+        "columns": result["columns"],
+        "width": result["width"],
+        "height": result["height"],
+        "cells": cells,
+        "missing": [item.id for item in atlas.items if item.id not in cells],
+    }
+
+@app.get("/api/thumbnails/atlas/{name}")
+async def get_thumbnail_atlas(name: str):
+    """Serve a built atlas (content-keyed, so cacheable forever)"""
+    if not re.fullmatch(r"[0-9a-f]{40}\.(webp|jpeg)", name):
+        raise HTTPException(status_code=404, detail="Atlas not found")
+    path = thumbnails.atlas_path(name)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Atlas not found")
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+@app.get("/api/holder-preview/{filename}")
+async def get_holder_preview(filename: str, request: Request,
+                             size: Optional[int] = Query(None, ge=1), format: str = "auto"):
+    """Serve holder preview images from Holders folder (a cached thumbnail when ?size= is given)"""
+    # Indexed lookup: category Previews folders first, then anywhere under Holders
+    loop = asyncio.get_running_loop()
+    preview_file = await loop.run_in_executor(None, holder_catalog.find_preview, filename)
+    if preview_file is None:
+        raise HTTPException(status_code=404, detail="Holder preview not found")
+    
+    if size and thumbnails.available:
+        return await thumbnail_response(request, preview_file, size, format)
+    return await asset_response(preview_file, "Holder preview not found")
 
 class PathRequest(BaseModel):
     path: str
@@ -487,6 +1021,9 @@ async def rename_file(request: RenameFileRequest):
             preview_renamed = True
             print(f"✅ Renamed preview: {old_preview.name} → {new_preview.name}")
         
+        # The cached holder listings still point at the old names
+        holder_catalog.invalidate()
+        
         # Log action
         log_action("rename_file", request.productName, "system", "webapp",
                  {"old": str(old_path), "new": str(new_path), "holderIndex": request.holderIndex})
@@ -559,75 +1096,224 @@ async def reveal_file(request: PathRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Audit Log Endpoints
+# The readers wait for the writer to flush and take the audit lock: keep them off the loop
 @app.get("/api/audit/recent")
 async def get_audit_log(limit: int = 100):
     """Get recent audit log entries"""
-    logs = get_recent_logs(limit)
+    logs = await asyncio.get_running_loop().run_in_executor(None, get_recent_logs, limit)
     return {"logs": logs, "count": len(logs)}
 
 @app.get("/api/audit/product/{product_name}")
 async def get_product_audit_log(product_name: str, limit: int = 50):
     """Get audit history for a specific product"""
-    logs = get_product_history(product_name, limit)
+    logs = await asyncio.get_running_loop().run_in_executor(None, get_product_history, product_name, limit)
     return {"logs": logs, "count": len(logs), "product": product_name}
 
+@app.get("/api/audit/query")
+async def query_audit_log(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    action: Optional[str] = None,
+    product: Optional[str] = None,
+    ip: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000)
+):
+    """Filter audit entries by time range, action, product and IP"""
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, query_logs, start, end, action, product, ip, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time bound: {e}")
+
+@app.get("/api/audit/stats")
+async def get_audit_stats():
+    """Background audit writer queue depth and flush latency, plus segment storage"""
+    storage = await asyncio.get_running_loop().run_in_executor(None, get_storage_stats)
+    return {**get_writer_stats(), "storage": storage}
+
 # Preview Extraction Endpoint
 @app.post("/api/extract-previews")
 async def extract_previews(request: Request):
-    """Extract preview images from 3D files"""
+    """Extract preview images from 3D files (runs as a background job; poll /api/jobs/{jobId})"""
     try:
-        # Import the extraction module
-        import sys
-        sys.path.insert(0, str(Path(__file__).parent.parent))
-        from extract_3d_previews import batch_extract_previews
-        
-        # Get client info
-        client_ip = request.client.host if request.client else "unknown"
-        user_agent = request.headers.get("user-agent", "unknown")
-        
-        # Check if specific products were requested
-        body = await request.json() if request.headers.get("content-type") == "application/json" else {}
-        product_names = body.get("productNames", [])
-        
-        total_count = 0
-        
-        if product_names:
-            # Extract previews for specific products
-            for product_name in product_names:
-                for range_folder in TOOLS_PATH.iterdir():
-                    if not range_folder.is_dir() or range_folder.name.startswith('_'):
-                        continue
-                    
-                    for category_folder in range_folder.iterdir():
-                        if not category_folder.is_dir() or category_folder.name.startswith('_'):
-                            continue
-                        
-                        product_folder = category_folder / product_name
-                        if product_folder.exists() and product_folder.is_dir():
-                            count = batch_extract_previews(product_folder, recursive=False, overwrite=False)
-                            total_count += count
-                            break
-        else:
-            # Extract from all products and holders
-            count = batch_extract_previews(TOOLS_PATH, recursive=True, overwrite=False)
-            total_count = count
-        
-        # Log the action
-        log_action("extract_previews", None, client_ip, user_agent, 
-                 {"extracted_count": total_count, "product_names": product_names or "all"})
-        
-        return {
-            "success": total_count,
-            "extracted": total_count,
-            "message": f"Extracted {total_count} preview images"
-        }
+        load_preview_extractor()
     except ImportError as e:
         raise HTTPException(
             status_code=501, 
             detail=f"Preview extraction not available: {str(e)}. PIL (Pillow) is required for BMP conversion."
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
+    
+    # Check if specific products were requested
+    body = await request.json() if request.headers.get("content-type") == "application/json" else {}
+    return submit_job_response("extract_previews", {"productNames": body.get("productNames") or []}, request)
+
+# === Background Jobs ===
+
+def load_preview_extractor():
+    """Import the preview extraction module (raises ImportError if Pillow is missing)"""
+    import extract_3d_previews
+    return extract_3d_previews
+
+def _job_client(job: Job):
+    return job.requested_by.get("ip", "unknown"), job.requested_by.get("userAgent", "unknown")
+
+def run_scan_job(job: Job):
+    """Job: run the database scanner, then pick up its changes in the product cache.
+
+    The scanner itself can't be interrupted, so cancel (and shutdown) are
+    honoured between phases.
+    """
+    if not scan_database_func:
+        raise RuntimeError("Scanner not available")
+    job.check_cancelled()
+    job.set_progress(0, 2, "Scanning database")
+    scan_database_func()
+    job.check_cancelled()
+    job.set_progress(1, 2, "Refreshing product cache")
+    _, stats = refresh_products()
+    job.check_cancelled()
+    job.set_progress(2, 2, "Done")
+    client_ip, user_agent = _job_client(job)
+    log_action("scan_database", None, client_ip, user_agent, {"status": "success", "job": job.id})
+    return {"message": "Database scanned successfully", "refresh": stats}
+
+def run_extract_previews_job(job: Job):
+    """Job: extract previews for the requested products, or the whole share"""
+    load_preview_extractor()
+    
+    product_names = job.params.get("productNames") or []
+    if product_names:
+        roots = [found[0] for found in map(find_product_folder, product_names) if found]
+        recursive = False
+    else:
+        # Extract from all products and holders
+        roots = [TOOLS_PATH]
+        recursive = True
+    job.check_cancelled()
+    
+    job.set_progress(0, None, "Looking for .3dm files")
+    stats = run_preview_pipeline(roots, recursive=recursive, overwrite=bool(job.params.get("overwrite")),
+                                 workers=PREVIEW_WORKERS, cancel_event=job.cancel_event,
+                                 progress=lambda done, total, name: job.set_progress(done, total, name))
+    
+    client_ip, user_agent = _job_client(job)
+    log_action("extract_previews", None, client_ip, user_agent,
+               {"extracted_count": stats["extracted"], "failed_count": stats["failed"],
+                "product_names": product_names or "all", "job": job.id})
+    return {**stats, "message": f"Extracted {stats['extracted']} preview images"}
+
+def run_auto_populate_job(job: Job):
+    """Job: batch auto-populate, like POST /api/products/auto-populate without the stream"""
+    if not autopop_batch:
+        raise RuntimeError("Auto-population module not available")
+    names = job.params.get("products")
+    if names is None:
+        folders = [Path(folder) for folder in product_cache.snapshot()]
+    else:
+        folders = [found[0] for found in map(find_product_folder, names) if found]
+    job.check_cancelled()
+    
+    client_ip, user_agent = _job_client(job)
+    succeeded = failed = 0
+    for result in autopop_batch(folders, force=bool(job.params.get("force")), workers=AUTOPOP_WORKERS,
+                                cancel_event=job.cancel_event, catalog=holder_catalog):
+        if result.get("success"):
+            succeeded += 1
+            product_cache.refresh_folder(Path(result["folder"]))
+        else:
+            failed += 1
+        log_action("auto_populate", result.get("productName"), client_ip, user_agent,
+                   {"status": "success" if result.get("success") else "failed", "job": job.id})
+        job.set_progress(succeeded + failed, len(folders), result.get("productName", ""))
+    return {"total": len(folders), "succeeded": succeeded, "failed": failed}
+
+job_scheduler.register("scan", run_scan_job, limit=1)
+job_scheduler.register("extract_previews", run_extract_previews_job, limit=1)
+job_scheduler.register("auto_populate", run_auto_populate_job, limit=1)
+
+# Accepted params per job kind: name -> (type, default). None is always accepted and means the default.
+JOB_PARAMS = {
+    "scan": {},
+    "extract_previews": {"productNames": ("list of strings", []), "overwrite": ("boolean", False)},
+    "auto_populate": {"products": ("list of strings", None), "force": ("boolean", False)},
+}
+_PARAM_CHECKS = {
+    "list of strings": lambda value: isinstance(value, list) and all(isinstance(v, str) for v in value),
+    "boolean": lambda value: isinstance(value, bool),
+}
+
+def validate_job_params(kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Check job params against JOB_PARAMS (400 on an unknown kind/param or a wrong type).
+
+    Returns every param of the kind with defaults filled in and lists sorted,
+    so equivalent requests get the same dedup key.
+    """
+    spec = JOB_PARAMS.get(kind)
+    if spec is None:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{kind}'. Use one of: {', '.join(JOB_PARAMS)}")
+    for name, value in params.items():
+        if name not in spec:
+            raise HTTPException(status_code=400, detail=f"Unknown parameter '{name}' for {kind} jobs")
+        expected = spec[name][0]
+        if value is not None and not _PARAM_CHECKS[expected](value):
+            raise HTTPException(status_code=400, detail=f"'{name}' must be a {expected}")
+    normalized = {}
+    for name, (_, default) in spec.items():
+        value = params.get(name)
+        normalized[name] = default if value is None else (sorted(value) if isinstance(value, list) else value)
+    return normalized
+
+def submit_job_response(kind: str, params: Dict[str, Any], request: Request):
+    """Queue a job and answer 202 with its state (an identical pending job is reused)"""
+    params = validate_job_params(kind, params)
+    requested_by = {
+        "ip": request.client.host if request.client else "unknown",
+        "userAgent": request.headers.get("user-agent", "unknown"),
+    }
+    try:
+        job, created = job_scheduler.submit(kind, params, requested_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "jobId": job.id,
+        "deduplicated": not created,
+        "job": job.to_dict(),
+    })
+
+class JobRequest(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+@app.post("/api/jobs")
+async def submit_job(job_request: JobRequest, request: Request):
+    """Submit a background job (kinds and params: JOB_PARAMS)"""
+    return submit_job_response(job_request.kind, job_request.params, request)
+
+@app.get("/api/jobs")
+async def list_jobs(kind: Optional[str] = None, state: Optional[str] = None,
+                    limit: int = Query(50, ge=1, le=500)):
+    """Recent jobs, most recent first"""
+    jobs = [job.to_dict() for job in job_scheduler.list(kind, state, limit)]
+    return {"jobs": jobs, "count": len(jobs), "stats": job_scheduler.stats()}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll one job's state, progress and result"""
+    job = job_scheduler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or ask a running one to stop"""
+    job = job_scheduler.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 # File Browse Endpoint
 class BrowseFileRequest(BaseModel):
@@ -0,0 +1,79 @@
+"""
+Rebuild the .3dm fixtures (needs rhino3dm and Pillow: pip install -r requirements-dev.txt).
+
+no_preview.3dm is written by rhino3dm 8. rhino3dm can't attach a preview
+image, so preview.3dm and compressed_preview.3dm are that same file with a
+TCODE_PROPERTIES_PREVIEWIMAGE / TCODE_PROPERTIES_COMPRESSED_PREVIEWIMAGE
+record inserted into its properties table, framed (chunk lengths, CRCs,
+compressed buffers) as openNURBS writes it. rhino3dm reads all three back,
+which is checked at the end.
+
+The preview is 24x16: left half blue, right half red.
+"""
+import io
+import struct
+import zlib
+from pathlib import Path
+
+import rhino3dm
+from PIL import Image
+
+HERE = Path(__file__).parent
+
+
+def chunk(typecode: int, payload: bytes, crc_data: bytes = None) -> bytes:
+    """A big chunk (8-byte length). openNURBS only feeds bytes written directly
+    in a chunk into its CRC, not the payloads of nested chunks."""
+    if typecode & 0x8000:
+        payload += struct.pack('<I', zlib.crc32(payload if crc_data is None else crc_data))
+    return struct.pack('<Iq', typecode, len(payload)) + payload
+
+
+def compressed_buffer(data: bytes):
+    """ON_BinaryArchive::WriteCompressedBuffer: (bytes, part covered by the enclosing CRC)"""
+    if not data:
+        return struct.pack('<I', 0), struct.pack('<I', 0)
+    prefix = struct.pack('<II', len(data), zlib.crc32(data)) + b'\x01'
+    return prefix + chunk(0x40008000, zlib.compress(data)), prefix
+
+
+def insert_record(base: bytes, record: bytes) -> bytes:
+    """Insert a record at the end of the properties table (before TCODE_ENDOFTABLE)"""
+    offset = 32
+    _, length = struct.unpack_from('<Iq', base, offset)  # start section comment
+    offset += 12 + length
+    typecode, length = struct.unpack_from('<Iq', base, offset)
+    assert typecode == 0x10000014, "expected the properties table"
+    body = base[offset + 12:offset + 12 + length]
+    end = body.rindex(struct.pack('<I', 0xFFFFFFFF))
+    body = body[:end] + record + body[end:]
+    return base[:offset] + struct.pack('<Iq', typecode, len(body)) + body + base[offset + 12 + length:]
+
+
+def main():
+    model = rhino3dm.File3dm()
+    model.Objects.AddSphere(rhino3dm.Sphere(rhino3dm.Point3d(0, 0, 0), 5))
+    model.Write(str(HERE / 'no_preview.3dm'), 8)
+    base = (HERE / 'no_preview.3dm').read_bytes()
+
+    image = Image.new('RGB', (24, 16), (200, 30, 40))
+    image.paste((20, 40, 220), (0, 0, 12, 16))
+    buf = io.BytesIO()
+    image.save(buf, 'BMP')
+    dib = buf.getvalue()[14:]
+    header, pixels = dib[:40], dib[40:]
+
+    (HERE / 'preview.3dm').write_bytes(insert_record(base, chunk(0x20008023, dib)))
+
+    palette, palette_crc = compressed_buffer(b'')
+    image_data, image_crc = compressed_buffer(pixels)
+    record = chunk(0x20008025, header + palette + image_data, header + palette_crc + image_crc)
+    (HERE / 'compressed_preview.3dm').write_bytes(insert_record(base, record))
+
+    for name in ('no_preview', 'preview', 'compressed_preview'):
+        assert rhino3dm.File3dm.Read(str(HERE / f'{name}.3dm')) is not None, name
+        print(f"✓ {name}.3dm")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Preview extraction against real .3dm files (see fixtures/make_fixtures.py).
+"""
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import extract_3d_previews
+from extract_3d_previews import PreviewError, extract_preview, read_preview_dib
+from preview_pipeline import run_pipeline
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def assert_preview_image(path: Path):
+    with Image.open(path) as img:
+        assert img.format == "JPEG"
+        assert img.size == (24, 16)
+        left, right = img.getpixel((3, 8)), img.getpixel((20, 8))
+    assert left[2] > 180 and left[0] < 60   # blue half
+    assert right[0] > 160 and right[2] < 80  # red half
+
+
+def test_file_without_preview():
+    assert read_preview_dib(FIXTURES / "no_preview.3dm") is None
+
+
+@pytest.mark.parametrize("name", ["preview.3dm", "compressed_preview.3dm"])
+def test_extract_preview(tmp_path, name):
+    dst = tmp_path / "out.jpg"
+    assert extract_preview(FIXTURES / name, dst) is True
+    assert_preview_image(dst)
+
+
+def test_preview_typecodes_have_crc_bit():
+    assert extract_3d_previews.TCODE_PROPERTIES_PREVIEWIMAGE == 0x20008023
+    assert extract_3d_previews.TCODE_PROPERTIES_COMPRESSED_PREVIEWIMAGE == 0x20008025
+
+
+def test_not_a_3dm_file(tmp_path):
+    bad = tmp_path / "bad.3dm"
+    bad.write_bytes(b"garbage" * 10)
+    with pytest.raises(PreviewError):
+        read_preview_dib(bad)
+
+
+def test_pipeline_extracts_then_skips(tmp_path):
+    for name in ("no_preview.3dm", "preview.3dm", "compressed_preview.3dm"):
+        shutil.copy(FIXTURES / name, tmp_path / name)
+
+    stats = run_pipeline([tmp_path], workers=2)
+    assert (stats["discovered"], stats["extracted"], stats["noPreview"], stats["failed"]) == (3, 2, 1, 0)
+    assert_preview_image(tmp_path / "compressed_preview.jpg")
+
+    rerun = run_pipeline([tmp_path], workers=2)
+    assert rerun["skipped"] == 2 and rerun["extracted"] == 0
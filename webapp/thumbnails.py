@@ -0,0 +1,313 @@
+"""
+Thumbnail Service
+Resized preview variants (THUMBNAIL_SIZES, WebP or JPEG) generated on demand
+and kept in a local disk cache, so list views don't pull full-resolution
+images off the network share for every table cell.
+
+Cache files are keyed by source path + size + mtime, so an edited source
+image simply gets a new key; stale variants are pruned by prune(), which
+runs in the background whenever PRUNE_FRACTION of max_bytes has been
+written since the last pass.
+
+build_atlas() packs many thumbnails into one sprite image plus a coordinate
+map, so a page of previews costs one image request instead of one per cell.
+The atlas is keyed by its thumbnails' keys, so it is immutable once built.
+"""
+import hashlib
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from PIL import Image, ImageOps, features as pil_features
+except ImportError:
+    Image = None
+    ImageOps = None
+    pil_features = None
+
+THUMBNAIL_SIZES = (64, 256, 1024)  # longest edge in px; requests are snapped up to one of these
+THUMBNAIL_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+THUMBNAIL_QUALITY = 82
+DEFAULT_WORKERS = 4
+ATLAS_COLUMNS = 10
+ATLAS_MAX_ITEMS = 200
+PRUNE_FRACTION = 0.1  # prune again once this share of max_bytes has been written since the last pass
+
+
+def snap_size(size: int) -> int:
+    """Smallest configured size that is at least `size`"""
+    return next((s for s in THUMBNAIL_SIZES if s >= size), THUMBNAIL_SIZES[-1])
+
+
+class ThumbnailService:
+    """On-demand and background thumbnail generation into a local cache"""
+
+    def __init__(self, cache_dir: Path, workers: int = DEFAULT_WORKERS, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.max_bytes = max_bytes  # None: never pruned
+        self.webp = bool(pil_features and pil_features.check('webp'))
+        self.hits = 0
+        self.generated = 0
+        self.errors = 0
+        self.pruned = 0
+        self._written = 0  # bytes written since the last prune
+        self._pruning = False
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[str] = set()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def pick_format(self, requested: str = "auto", accept: str = "") -> str:
+        """Resolve "auto" from the Accept header (WebP when the browser and Pillow support it)"""
+        if requested == "webp" and self.webp:
+            return "webp"
+        if requested == "auto" and self.webp and "image/webp" in accept:
+            return "webp"
+        return "jpeg"
+
+    def _key(self, source: Path, size: int, fmt: str) -> Tuple[str, os.stat_result]:
+        st = os.stat(source)
+        ident = f"{os.path.normcase(os.path.abspath(source))}|{size}|{fmt}|{st.st_mtime_ns}|{st.st_size}"
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest(), st
+
+    def _path(self, key: str, fmt: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{fmt}"
+
+    def get(self, source: Path, size: int, fmt: str = "jpeg") -> Tuple[Path, str, str]:
+        """Return (cached thumbnail path, media type, etag), generating it if needed.
+
+        Raises FileNotFoundError if the source is gone.
+        """
+        size = snap_size(size)
+        key, _ = self._key(source, size, fmt)
+        path = self._path(key, fmt)
+        media_type = THUMBNAIL_FORMATS[fmt][1]
+        if path.exists():
+            self.hits += 1
+            return path, media_type, key
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                # Another request may have generated it while we waited
+                if not path.exists():
+                    self._generate(source, size, fmt, path)
+            finally:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        return path, media_type, key
+
+    def _generate(self, source: Path, size: int, fmt: str, path: Path):
+        try:
+            with Image.open(source) as img:
+                img = ImageOps.exif_transpose(img)
+                img.thumbnail((size, size), Image.LANCZOS)
+                if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+                    # JPEG has no alpha: flatten onto white like the UI background
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    rgba = img.convert("RGBA")
+                    background.paste(rgba, mask=rgba.split()[-1])
+                    img = background
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+                img.save(tmp_path, THUMBNAIL_FORMATS[fmt][0], quality=THUMBNAIL_QUALITY)
+            os.replace(tmp_path, path)
+            self.generated += 1
+            self._wrote(path)
+        except Exception:
+            self.errors += 1
+            raise
+
+    # === SPRITE ATLAS ===
+
+    def atlas_path(self, name: str) -> Path:
+        return self.cache_dir / "atlas" / name
+
+    def build_atlas(self, sources: List[Optional[Path]], size: int, fmt: str = "jpeg") -> Dict[str, Any]:
+        """Pack thumbnails of sources into one image.
+
+        Returns the atlas file name, grid geometry and one cell (x, y, w, h
+        in atlas pixels) per source, or None where the source is missing or
+        unreadable. Thumbnails are centered in size x size cells.
+        """
+        size = snap_size(size)
+        if len(sources) > ATLAS_MAX_ITEMS:
+            raise ValueError(f"At most {ATLAS_MAX_ITEMS} images per atlas")
+
+        def thumb(source: Optional[Path]) -> Optional[Tuple[Path, str]]:
+            if source is None:
+                return None
+            try:
+                path, _, key = self.get(source, size, fmt)
+                return path, key
+            except Exception:
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            thumbs = list(pool.map(thumb, sources))
+
+        present = [t for t in thumbs if t]
+        columns = max(1, min(ATLAS_COLUMNS, len(present)))
+        rows = max(1, math.ceil(len(present) / columns))
+        key = hashlib.sha1(f"{size}|{fmt}|{columns}|".encode('utf-8') +
+                           '|'.join(k for _, k in present).encode('utf-8')).hexdigest()
+        name = f"{key}.{fmt}"
+        path = self.atlas_path(name)
+
+        cells: List[Optional[Dict[str, int]]] = []
+        placed = []
+        for t in thumbs:
+            if t is None:
+                cells.append(None)
+                continue
+            i = len(placed)
+            placed.append(t[0])
+            cells.append({"x": (i % columns) * size, "y": (i // columns) * size, "w": size, "h": size})
+
+        if not path.exists() and placed:
+            mode = "RGBA" if fmt == "webp" else "RGB"
+            background = (255, 255, 255, 0) if mode == "RGBA" else (255, 255, 255)
+            atlas = Image.new(mode, (columns * size, rows * size), background)
+            for i, thumb_path in enumerate(placed):
+                with Image.open(thumb_path) as img:
+                    img = img.convert(mode)
+                    x = (i % columns) * size + (size - img.width) // 2
+                    y = (i // columns) * size + (size - img.height) // 2
+                    atlas.paste(img, (x, y))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+            atlas.save(tmp_path, THUMBNAIL_FORMATS[fmt][0], quality=THUMBNAIL_QUALITY)
+            os.replace(tmp_path, path)
+            self._wrote(path)
+
+        return {
+            "name": name if placed else None,
+            "mediaType": THUMBNAIL_FORMATS[fmt][1],
+            "size": size,
+            "columns": columns,
+            "width": columns * size,
+            "height": rows * size,
+            "cells": cells,
+        }
+
+    # === BACKGROUND PREGENERATION ===
+
+    def pregenerate(self, sources: Iterable[Path], sizes: Iterable[int], fmt: str = "webp") -> int:
+        """Queue thumbnails for sources on the background pool; returns how many were queued"""
+        if not self.available:
+            return 0
+        if fmt == "webp" and not self.webp:
+            fmt = "jpeg"
+        sizes = tuple(sizes)
+        queued = 0
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="thumbnails")
+            for source in sources:
+                ident = f"{source}|{fmt}"
+                if ident in self._pending:
+                    continue
+                self._pending.add(ident)
+                self._pool.submit(self._pregenerate_one, Path(source), sizes, fmt, ident)
+                queued += 1
+        return queued
+
+    def _pregenerate_one(self, source: Path, sizes: Tuple[int, ...], fmt: str, ident: str):
+        try:
+            for size in sizes:
+                self.get(source, size, fmt)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Warning: thumbnail pregeneration failed for {source}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(ident)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False)
+
+    # === MAINTENANCE ===
+
+    def _wrote(self, path: Path):
+        """Count a new cache file; start a background prune once enough has been written"""
+        if self.max_bytes is None:
+            return
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        with self._lock:
+            self._written += size
+            due = self._written >= self.max_bytes * PRUNE_FRACTION
+        if due:
+            self.start_prune()
+
+    def start_prune(self):
+        """Prune below max_bytes in the background (result or error is logged)"""
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            if self._pruning:
+                return
+            self._pruning = True
+            self._written = 0
+        threading.Thread(target=self._run_prune, name="thumbnail-prune", daemon=True).start()
+
+    def _run_prune(self):
+        try:
+            # Down to a low-water mark, so the next pass is another PRUNE_FRACTION of writes away
+            removed = self.prune(int(self.max_bytes * (1 - PRUNE_FRACTION)))
+            self.pruned += removed
+            if removed:
+                print(f"🧹 Thumbnail cache pruned: {removed} file(s) removed")
+        except Exception as e:
+            print(f"Warning: thumbnail cache prune failed: {e}")
+        finally:
+            with self._lock:
+                self._pruning = False
+
+    def prune(self, max_bytes: int) -> int:
+        """Delete least recently written thumbnails beyond max_bytes; returns files removed"""
+        files = []
+        for path in self.cache_dir.glob("*/*.*"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "webp": self.webp,
+            "hits": self.hits,
+            "generated": self.generated,
+            "errors": self.errors,
+            "pruned": self.pruned,
+            "pending": len(self._pending),
+        }